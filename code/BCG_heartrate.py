@@ -1,11 +1,11 @@
 import os
-import matplotlib
-matplotlib.use('TkAgg')  # Add this line before importing pyplot
 import pandas as pd
 import numpy as np
-import matplotlib.pyplot as plt
+import rendering
+from artifacts import masked_rates
+from records import WindowRates, as_signal
 from band_pass_filtering import band_pass_filtering
-from compute_vitals import vitals
+from compute_vitals import estimate_rates
 
 
 def load_bcg_data(filepath: str) -> tuple[np.ndarray, np.ndarray]:
@@ -13,55 +13,80 @@ def load_bcg_data(filepath: str) -> tuple[np.ndarray, np.ndarray]:
     df = pd.read_csv(filepath)
     return df['BCG'].values, df['Timestamp'].values
 
+def load_bcg_batch(filepaths: list[str]) -> tuple[np.ndarray, np.ndarray]:
+    """Load several resampled BCG CSVs of the same length (e.g. the sensors
+    of one bed, or the nights of several subjects) as (channels, samples)
+    float32 signals and int64 timestamps."""
+    loaded = [load_bcg_data(path) for path in filepaths]
+    lengths = {len(signal) for signal, _ in loaded}
+    if len(lengths) > 1:
+        raise ValueError(f"Recordings differ in length: {sorted(lengths)}")
+    signals = np.stack([as_signal(signal) for signal, _ in loaded])
+    timestamps = np.stack([np.asarray(ts, dtype=np.int64) for _, ts in loaded])
+    return signals, timestamps
+
 def compute_filtered_signal(signal: np.ndarray, fs: int) -> np.ndarray:
-    """Apply bandpass filtering to the BCG signal."""
-    return band_pass_filtering(signal, fs, filter_type="bcg")
+    """Apply bandpass filtering to the BCG signal (along the last axis, so
+    (channels, samples) arrays are filtered in one call)."""
+    return band_pass_filtering(signal, fs, filter_type="bcg", axis=-1)
+
+def calculate_bpm_array(filtered_signal: np.ndarray, fs: int, win_sec: int = 10,
+                        hop_sec: float = None, estimator: str = 'peaks',
+                        artifacts: np.ndarray = None) -> np.ndarray:
+    """Compute heart rate (BPM) over sliding windows.
+
+    Without hop_sec the windows do not overlap; with it a window starts every
+    hop_sec seconds (see compute_vitals.peak_rates). estimator
+    selects a rate engine of compute_vitals.ESTIMATORS ('peaks', 'spectral',
+    'autocorr' or 'fusion'). artifacts is an optional boolean mask of the
+    windows (artifacts.detect_artifacts); those windows are NaN and, for
+    non-overlapping windows, not estimated at all.
 
-def calculate_bpm_array(filtered_signal: np.ndarray, fs: int, win_sec: int = 10) -> np.ndarray:
-    """Compute heart rate (BPM) over sliding windows."""
+    A (channels, samples) signal gives (channels, windows) rates, estimated
+    for all channels in one batch."""
     win_size = int(win_sec * fs)
-    window_limit = len(filtered_signal) // win_size
-    time_ms = np.arange(len(filtered_signal)) * (1000 / fs)
-    
-    bpm_array = vitals(
-        t1=0,
-        t2=win_size,
-        win_size=win_size,
-        window_limit=window_limit,
-        sig=filtered_signal,
-        time=time_ms,
-        mpd=int(0.5 * fs),  # Minimum peak distance = 0.5 sec
-        plot=0
-    )
+    if artifacts is not None and not hop_sec:
+        return masked_rates(lambda sig: estimate_rates(sig, fs, win_size, method=estimator),
+                            filtered_signal, win_size, artifacts)
+    hop = max(1, int(hop_sec * fs)) if hop_sec else None
+    bpm_array = estimate_rates(filtered_signal, fs, win_size, hop=hop, method=estimator)
+    if artifacts is not None:
+        bpm_array = np.where(artifacts[..., :bpm_array.shape[-1]], np.nan, bpm_array)
     return bpm_array
 
-def build_bpm_dataframe(bpm_array: np.ndarray, timestamps: np.ndarray, fs: int, win_sec: int = 10) -> pd.DataFrame:
-    """Create a DataFrame with timestamps and BPM values."""
-    win_size = int(win_sec * fs)
-    timestamps = timestamps[::win_size][:len(bpm_array)]
-    return pd.DataFrame({'Timestamp': timestamps, 'Heart Rate': bpm_array})
+def build_bpm_dataframe(bpm_array: np.ndarray, timestamps: np.ndarray, fs: int, win_sec: int = 10,
+                        hop_sec: float = None, artifacts: np.ndarray = None) -> pd.DataFrame:
+    """Create a DataFrame with window start timestamps and BPM values, plus
+    the artifact flag of every window when a mask is given (the file-based
+    counterpart of Recording.windows(...).to_frame())."""
+    step = max(1, int(hop_sec * fs)) if hop_sec else int(win_sec * fs)
+    return WindowRates.from_timestamps(timestamps, bpm_array, step, 'Heart Rate',
+                                       artifacts).to_frame()
 
-def plot_bpm_over_time(df: pd.DataFrame, output_path: str):
+def plot_bpm_over_time(df: pd.DataFrame, output_path: str, dpi: int = rendering.DEFAULT_DPI):
     """Plot BPM vs. Time with smoothing and improved style, and save to file."""
-    import os
-    plt.figure(figsize=(12, 6))
+    fig = rendering.get_figure("bpm", (12, 6))
+    ax = fig.add_subplot()
     # Plot raw data
-    plt.plot(df['Timestamp'], df['Heart Rate'], marker='o', linestyle='-', color='lightcoral', markersize=2, linewidth=0.7, alpha=0.5, label='Raw HR')
+    ax.plot(df['Timestamp'], df['Heart Rate'], marker='o', linestyle='-', color='lightcoral', markersize=2, linewidth=0.7, alpha=0.5, label='Raw HR')
     # Plot rolling mean
     if len(df) > 20:
-        df['HR_Smooth'] = df['Heart Rate'].rolling(window=20, min_periods=1, center=True).mean()
-        plt.plot(df['Timestamp'], df['HR_Smooth'], color='navy', linewidth=2, label='Smoothed HR')
-    plt.title("Heart Rate Over Time", fontsize=16)
-    plt.xlabel("Timestamp (ms)", fontsize=14)
-    plt.ylabel("Heart Rate (BPM)", fontsize=14)
-    plt.ylim(df['Heart Rate'].min() - 5, df['Heart Rate'].max() + 5)
-    plt.grid(True, linestyle='--', alpha=0.6)
-    plt.legend()
-    plt.tight_layout()
+        hr_smooth = df['Heart Rate'].rolling(window=20, min_periods=1, center=True).mean()
+        ax.plot(df['Timestamp'], hr_smooth, color='navy', linewidth=2, label='Smoothed HR')
+    if 'Artifact' in df and df['Artifact'].any():
+        ax.fill_between(df['Timestamp'], 0, 1, where=df['Artifact'].values, step='post',
+                        transform=ax.get_xaxis_transform(), color='0.85', label='Artifact')
+    ax.set_title("Heart Rate Over Time", fontsize=16)
+    ax.set_xlabel("Timestamp (ms)", fontsize=14)
+    ax.set_ylabel("Heart Rate (BPM)", fontsize=14)
+    if df['Heart Rate'].notna().any():  # every window may be masked
+        ax.set_ylim(df['Heart Rate'].min() - 5, df['Heart Rate'].max() + 5)
+    ax.grid(True, linestyle='--', alpha=0.6)
+    ax.legend()
+    fig.tight_layout()
     # Save plot to the same directory as output CSV, with .png extension
     plot_path = os.path.splitext(output_path)[0] + ".png"
-    plt.savefig(plot_path, dpi=300)
-    plt.close()
+    fig.savefig(plot_path, dpi=dpi)
     print(f"Saved BPM plot to: {plot_path}")
 
 def save_bpm_to_csv(df: pd.DataFrame, output_path: str):
@@ -22,6 +22,23 @@ def evaluate_heart_rate(reference_csv_path, estimated_csv_path, column_name='Hea
     y_ref = ref_df[column_name].values
     y_est = est_df[column_name].values
 
+    return compute_heart_rate_metrics(y_ref, y_est)
+
+
+def compute_heart_rate_metrics(y_ref, y_est):
+    """
+    Compute MAE, RMSE and MAPE of aligned estimated vs. reference heart rates.
+
+    Parameters:
+    - y_ref (np.ndarray): Reference heart rate values.
+    - y_est (np.ndarray): Estimated heart rate values, aligned with y_ref.
+
+    Returns:
+    - dict: A dictionary containing MAE, RMSE, and MAPE values.
+    """
+    y_ref = np.asarray(y_ref)
+    y_est = np.asarray(y_est)
+
     # Check alignment
     if len(y_ref) != len(y_est):
         raise ValueError(f"Length mismatch: reference={len(y_ref)}, estimated={len(y_est)}")
@@ -38,6 +55,56 @@ def evaluate_heart_rate(reference_csv_path, estimated_csv_path, column_name='Hea
 
     return {"MAE": mae, "RMSE": rmse, "MAPE": mape}
 
+
+COHORT_COLUMNS = ["N", "MAE", "RMSE", "MAPE", "Bias", "LoA_low", "LoA_high", "Pearson_r"]
+
+
+def cohort_metrics(labels, refs, ests, pooled_label="pooled"):
+    """
+    Error, Bland-Altman and correlation statistics for many pairs at once.
+
+    All pairs are concatenated and reduced with np.bincount on a pair index, so
+    the cost is one pass over the samples whatever the number of pairs.
+
+    Parameters:
+    - labels (list): One label per pair.
+    - refs (list of np.ndarray): Reference heart rates of each pair.
+    - ests (list of np.ndarray): Estimated heart rates, aligned with refs.
+    - pooled_label (str): Label of the extra row over all samples of all pairs.
+
+    Returns:
+    - pd.DataFrame: One row per pair plus the pooled row, with the columns
+      N, MAE, RMSE, MAPE, Bias (mean of est - ref), LoA_low / LoA_high
+      (Bias -/+ 1.96 SD) and Pearson_r.
+    """
+    sizes = np.array([len(r) for r in refs], dtype=np.int64)
+    if any(len(r) != len(e) for r, e in zip(refs, ests)):
+        raise ValueError("Length mismatch between reference and estimated series")
+    y_ref = np.concatenate([np.asarray(r, dtype=np.float64) for r in refs] or [np.empty(0)])
+    y_est = np.concatenate([np.asarray(e, dtype=np.float64) for e in ests] or [np.empty(0)])
+    groups = np.repeat(np.arange(len(sizes)), sizes)
+    err = y_est - y_ref
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        terms = np.stack([np.ones_like(err), np.abs(err), err ** 2, np.abs(err / y_ref), err,
+                          y_ref, y_est, y_ref ** 2, y_est ** 2, y_ref * y_est])
+        sums = np.stack([np.bincount(groups, weights=t, minlength=len(sizes)) for t in terms], axis=1)
+        sums = np.vstack([sums, terms.sum(axis=1)])
+        n, s_abs, s_sq, s_pct, s_err, sx, sy, sxx, syy, sxy = sums.T
+
+        mae = s_abs / n
+        rmse = np.sqrt(s_sq / n)
+        mape = s_pct / n * 100
+        bias = s_err / n
+        sd = np.sqrt((s_sq - n * bias ** 2) / (n - 1))
+        cov = sxy - sx * sy / n
+        r = cov / np.sqrt((sxx - sx ** 2 / n) * (syy - sy ** 2 / n))
+
+    return pd.DataFrame({
+        "N": n.astype(np.int64), "MAE": mae, "RMSE": rmse, "MAPE": mape, "Bias": bias,
+        "LoA_low": bias - 1.96 * sd, "LoA_high": bias + 1.96 * sd, "Pearson_r": r,
+    }, index=pd.Index(list(labels) + [pooled_label], name="Pair"))
+
 #MAE (Mean Absolute Error):
 # Calculates the absolute difference between each pair of estimated and reference values.
 # Then, it computes the average of these absolute differences. MAE gives an idea of the average magnitude of the errors.
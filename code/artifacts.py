@@ -0,0 +1,91 @@
+"""
+Motion / artifact detection on the resampled BCG, per heart-rate window.
+
+Body movements on the mattress swing the microbend signal far beyond its
+resting range and often saturate the ADC; the peaks found in such windows are
+not heart beats. Every window gets three statistics from a strided
+(copy-free) view of the raw resampled signal:
+
+- clip: share of samples sitting at the smallest or largest value of the
+  recording (a saturated sensor stays on the rail);
+- spread: standard deviation relative to the median over all windows
+  (flags movements, and also a flat signal when nobody is on the bed);
+- energy: RMS of the first difference relative to the median (sudden jerks
+  that leave the spread unchanged).
+
+Thresholds are relative to the recording itself, so they do not depend on
+sensor gain or ADC offset. Windows flagged as artifacts are skipped by the
+rate estimators and reported as NaN.
+"""
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+# default thresholds of detect_artifacts
+MAX_CLIP = 0.02
+MAX_SPREAD = 2.0
+MIN_SPREAD = 0.1
+MAX_ENERGY = 4.0
+
+
+def window_view(sig: np.ndarray, win_size: int, hop: int = None) -> np.ndarray:
+    """Read-only (windows, win_size) view of sig, a window every hop samples
+    (default: non-overlapping); trailing samples of a partial window are
+    ignored."""
+    sig = np.asarray(sig)
+    if sig.shape[-1] < win_size:
+        return np.empty(sig.shape[:-1] + (0, win_size), dtype=sig.dtype)
+    return sliding_window_view(sig, win_size, axis=-1)[..., ::hop or win_size, :]
+
+
+def window_stats(sig: np.ndarray, win_size: int, hop: int = None) -> dict:
+    """Per-window clip share, standard deviation and first-difference RMS."""
+    sig = np.asarray(sig)
+    windows = window_view(sig, win_size, hop)
+    if windows.shape[-2] == 0:
+        empty = np.zeros(windows.shape[:-1])
+        return {"clip": empty, "std": empty, "diff_rms": empty}
+    lo = sig.min(axis=-1, keepdims=True)[..., None]
+    hi = sig.max(axis=-1, keepdims=True)[..., None]
+    clip = ((windows == lo) | (windows == hi)).mean(axis=-1)
+    std = windows.std(axis=-1, dtype=np.float64)
+    diff_rms = np.sqrt(np.mean(np.diff(windows, axis=-1).astype(np.float64) ** 2, axis=-1))
+    return {"clip": clip, "std": std, "diff_rms": diff_rms}
+
+
+def _relative(values: np.ndarray) -> np.ndarray:
+    median = np.median(values, axis=-1, keepdims=True)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(median > 0, values / median, 1.0)
+
+
+def detect_artifacts(sig: np.ndarray, win_size: int, hop: int = None, max_clip: float = MAX_CLIP,
+                     max_spread: float = MAX_SPREAD, min_spread: float = MIN_SPREAD,
+                     max_energy: float = MAX_ENERGY) -> np.ndarray:
+    """Boolean artifact mask, one entry per window of the raw signal sig
+    (along its last axis)."""
+    stats = window_stats(sig, win_size, hop)
+    spread = _relative(stats["std"])
+    energy = _relative(stats["diff_rms"])
+    return ((stats["clip"] > max_clip) | (spread > max_spread) | (spread < min_spread)
+            | (energy > max_energy))
+
+
+def masked_rates(estimate, sig: np.ndarray, win_size: int, artifacts: np.ndarray) -> np.ndarray:
+    """Rates of the non-overlapping windows of sig with artifact windows
+    skipped: the clean windows are packed back to back, estimate(packed)
+    runs on them only and the artifact windows are NaN. sig may be
+    (channels, samples) with a (channels, windows) mask; the clean windows of
+    all channels are then packed into one signal.
+
+    Only valid for estimators whose windows are independent of each other."""
+    n_windows = artifacts.shape[-1]
+    rates = np.full(artifacts.shape, np.nan)
+    clean = ~artifacts
+    if clean.all():
+        rates[:] = estimate(sig)[..., :n_windows]
+    elif clean.any():
+        sig = np.asarray(sig)[..., :n_windows * win_size]
+        packed = sig.reshape(artifacts.shape + (win_size,))[clean]
+        rates[clean] = estimate(packed.ravel())
+    return rates
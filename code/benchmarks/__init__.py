@@ -0,0 +1,2 @@
+"""Benchmarks for the BCG pipeline; run them from the code/ directory,
+e.g. ``python -m benchmarks.bench_detect_peaks``."""
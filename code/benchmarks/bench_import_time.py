@@ -0,0 +1,62 @@
+"""
+Startup cost of the pipeline modules, measured with `python -X importtime`.
+
+Each module is imported in a fresh interpreter (run from code/); the report
+lists its total import time, the heaviest dependencies it pulled in and
+whether any of the plotting/statistics packages were loaded. The run fails
+when a module exceeds --budget-ms.
+
+    python -m benchmarks.bench_import_time [--modules main pipeline] [--top 8]
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+
+HEAVY = ("matplotlib", "matplotlib.pyplot", "seaborn", "scipy.stats")
+
+
+def import_times(module: str, repeat: int = 3):
+    """(total_us, {package: cumulative_us}) of the fastest of `repeat` imports."""
+    best = None
+    for _ in range(repeat):
+        proc = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                              capture_output=True, text=True, cwd=os.getcwd(), check=True)
+        cumulative = {}
+        for line in proc.stderr.splitlines():
+            if not line.startswith("import time:") or "cumulative" in line:
+                continue
+            _, cum_us, name = line.split("|")
+            cumulative[name.strip()] = int(cum_us)
+        total = cumulative.get(module, 0)
+        if best is None or total < best[0]:
+            best = (total, cumulative)
+    return best
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--modules", nargs="+", default=["main", "pipeline", "rendering", "plotting"])
+    parser.add_argument("--top", type=int, default=8)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--budget-ms", type=float, default=1000)
+    args = parser.parse_args(argv)
+
+    failed = False
+    for module in args.modules:
+        total, cumulative = import_times(module, args.repeat)
+        loaded = [name for name in HEAVY if name in cumulative]
+        print(f"\n{module}: {total / 1000:.0f} ms"
+              f"  (heavy: {', '.join(loaded) if loaded else 'none'})")
+        top = sorted(((us, name) for name, us in cumulative.items()
+                      if name != module and "." not in name), reverse=True)
+        for us, name in top[:args.top]:
+            print(f"  {us / 1000:8.1f} ms  {name}")
+        failed |= total / 1000 > args.budget_ms
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+"""
+Memory held and allocated by the pipeline stages, measured with tracemalloc.
+
+A synthetic recording is written to a temporary directory and run through the
+resample, heart-rate and breathing stages. For every stage the report lists
+the memory still held afterwards (the stage result plus everything kept
+alive) and the peak reached while it ran; NumPy buffers are included.
+
+    python -m benchmarks.bench_memory [--minutes 480] [--fs 140]
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import tempfile
+import tracemalloc
+from pathlib import Path
+import scipy.signal  # noqa: F401  (imported lazily by the stages, not counted)
+import pipeline
+from benchmarks.synthetic import write_recording
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--minutes", type=float, default=480)
+    parser.add_argument("--fs", type=float, default=140)
+    parser.add_argument("--chunk-size", type=int, default=None)
+    args = parser.parse_args(argv)
+
+    # no input cache: measure the parser too
+    os.environ["BCG_CACHE_DIR"] = ""
+    with tempfile.TemporaryDirectory() as tmp:
+        bcg_path, _ = write_recording(Path(tmp), minutes=args.minutes, fs=args.fs, noise=60)
+        tracemalloc.start()
+
+        def measure(name, func):
+            tracemalloc.reset_peak()
+            with contextlib.redirect_stdout(io.StringIO()):
+                result = func()
+            held, peak = tracemalloc.get_traced_memory()
+            print(f"{name:<12} {held / 2**20:10.1f} {peak / 2**20:10.1f}")
+            return result
+
+        print(f"{'stage':<12} {'held [MB]':>10} {'peak [MB]':>10}")
+        resampled = measure("resample", lambda: pipeline.resample_stage(
+            bcg_path, chunk_size=args.chunk_size))
+        measure("heart_rate", lambda: pipeline.heart_rate_stage(resampled))
+        measure("breathing", lambda: pipeline.breathing_stage(resampled))
+        tracemalloc.stop()
+        print(f"Resampled recording: {len(resampled)} samples, "
+              f"{(resampled.bcg.nbytes + resampled.offsets_ms.nbytes) / 2**20:.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,244 @@
+"""
+Throughput benchmarks of the pipeline stages on synthetic recordings.
+
+Every benchmark is timed best-of --repeat for each recording length and
+reported in samples per second. Results can be saved with --save and
+compared against an earlier run with --compare, which fails when a
+benchmark got slower than --threshold times its saved time.
+
+    python -m benchmarks.bench_pipeline [--minutes 10 60] [--only vitals ...]
+    python -m benchmarks.bench_pipeline --save before.json
+    python -m benchmarks.bench_pipeline --compare before.json
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+import numpy as np
+import BCG_heartrate as BCG_hr
+import change_timestamp as ct
+import generate_timestamp_and_resampling as gtr
+import synchronization as sync
+from band_pass_filtering import band_pass_filtering
+from compute_vitals import vitals, vitals_vectorized, vitals_sliding, estimate_rates
+from detect_peaks import detect_peaks
+from parallel import parallel_bpm_array
+from artifacts import detect_artifacts
+from benchmarks.synthetic import synthetic_bcg, write_recording
+
+FS = 50.0
+FS_RAW = 140.0
+
+BENCHMARKS = {}
+
+
+def benchmark(name):
+    """Register setup(minutes, workdir) -> (callable, samples processed)."""
+    def register(setup):
+        BENCHMARKS[name] = setup
+        return setup
+    return register
+
+
+def _filtered(minutes):
+    sig, _ = synthetic_bcg(minutes, FS, noise=60)
+    return BCG_hr.compute_filtered_signal(sig, FS)
+
+
+def _vitals_args(x):
+    win_size = int(10 * FS)
+    return dict(t1=0, t2=win_size, win_size=win_size, window_limit=len(x) // win_size,
+                sig=x, time=np.arange(len(x)) * (1000 / FS), mpd=int(0.5 * FS))
+
+
+@benchmark("detect_peaks")
+def setup_detect_peaks(minutes, workdir):
+    x = _filtered(minutes)
+    return lambda: detect_peaks(x, mpd=int(0.5 * FS)), x.size
+
+
+@benchmark("band_pass_filtering")
+def setup_band_pass(minutes, workdir):
+    sig, _ = synthetic_bcg(minutes, FS, noise=60)
+    return lambda: band_pass_filtering(sig, FS, "bcg"), sig.size
+
+
+@benchmark("band_pass_filtering_fused")
+def setup_band_pass_fused(minutes, workdir):
+    sig, _ = synthetic_bcg(minutes, FS, noise=60)
+    return lambda: band_pass_filtering(sig, FS, "bcg", fused=True), sig.size
+
+
+@benchmark("vitals")
+def setup_vitals(minutes, workdir):
+    x = _filtered(minutes)
+    return lambda: vitals(**_vitals_args(x)), x.size
+
+
+@benchmark("vitals_vectorized")
+def setup_vitals_vectorized(minutes, workdir):
+    x = _filtered(minutes)
+    return lambda: vitals_vectorized(**_vitals_args(x)), x.size
+
+
+@benchmark("vitals_sliding_1s")
+def setup_vitals_sliding(minutes, workdir):
+    x = _filtered(minutes)
+    args = _vitals_args(x)
+    return lambda: vitals_sliding(x, args["time"], args["win_size"], int(FS), args["mpd"]), x.size
+
+
+@benchmark("detect_artifacts")
+def setup_detect_artifacts(minutes, workdir):
+    sig, _ = synthetic_bcg(minutes, FS, noise=60, motion_per_hour=30)
+    return lambda: detect_artifacts(sig, int(10 * FS)), sig.size
+
+
+@benchmark("spectral_rates")
+def setup_spectral(minutes, workdir):
+    x = _filtered(minutes)
+    return lambda: estimate_rates(x, FS, int(10 * FS), method="spectral"), x.size
+
+
+@benchmark("autocorr_rates")
+def setup_autocorr(minutes, workdir):
+    x = _filtered(minutes)
+    return lambda: estimate_rates(x, FS, int(10 * FS), method="autocorr"), x.size
+
+
+@benchmark("parallel_bpm_4_threads")
+def setup_parallel_bpm(minutes, workdir):
+    sig, _ = synthetic_bcg(minutes, FS, noise=60)
+    return lambda: parallel_bpm_array(sig, FS, workers=4, segment_sec=300), sig.size
+
+
+def _ward(minutes, beds=16):
+    return np.stack([synthetic_bcg(minutes, FS, noise=60, hr_mean=55 + 2 * i, seed=i)[0]
+                     for i in range(beds)]).astype(np.float32)
+
+
+@benchmark("bpm_16_beds_loop")
+def setup_bpm_loop(minutes, workdir):
+    ward = _ward(minutes)
+
+    def run():
+        for sig in ward:
+            BCG_hr.calculate_bpm_array(BCG_hr.compute_filtered_signal(sig, FS), FS)
+    return run, ward.size
+
+
+@benchmark("bpm_16_beds_batch")
+def setup_bpm_batch(minutes, workdir):
+    ward = _ward(minutes)
+    return lambda: BCG_hr.calculate_bpm_array(BCG_hr.compute_filtered_signal(ward, FS), FS), ward.size
+
+
+def _raw_frame(minutes, workdir):
+    bcg_path, _ = write_recording(workdir / "data", minutes=minutes, fs=FS_RAW, noise=60)
+    return gtr.load_and_expand_timestamps(str(bcg_path))
+
+
+@benchmark("resample_signal")
+def setup_resample(minutes, workdir):
+    df = _raw_frame(minutes, workdir)
+    return lambda: gtr.resample_signal(df, FS), len(df)
+
+
+@benchmark("resample_signal_poly")
+def setup_resample_poly(minutes, workdir):
+    df = _raw_frame(minutes, workdir)
+    return lambda: gtr.resample_signal(df, FS, method="poly"), len(df)
+
+
+@benchmark("synchronize_signals")
+def setup_synchronize(minutes, workdir):
+    bcg_path, rr_path = write_recording(workdir / "data", minutes=minutes, fs=FS_RAW, noise=60)
+    resampled = gtr.resample_signal(gtr.load_and_expand_timestamps(str(bcg_path)), FS)
+    bpm = BCG_hr.calculate_bpm_array(BCG_hr.compute_filtered_signal(resampled["BCG"].values, FS), FS)
+    bpm_df = BCG_hr.build_bpm_dataframe(bpm, resampled["Timestamp"].values, FS)
+    hr_csv = workdir / "bcg_hr_ts_fmt.csv"
+    ct.export_with_formatted_timestamps(bpm_df, hr_csv)
+    n_rr = sum(1 for _ in open(rr_path)) - 1
+
+    def run():
+        sync.synchronize_signals(str(hr_csv), str(rr_path),
+                                 str(workdir / "hr_sync.csv"), str(workdir / "rr_sync.csv"))
+    return run, len(bpm_df) + n_rr
+
+
+@benchmark("process_pair")
+def setup_process_pair(minutes, workdir):
+    import main
+    bcg_path, rr_path = write_recording(workdir / "data", minutes=minutes, fs=FS_RAW, noise=60)
+    main.RESULTS_ROOT = workdir / "results"
+    n = sum(1 for _ in open(bcg_path)) - 1
+
+    def run():
+        main.process_pair("01", bcg_path, rr_path, plots="off", incremental=False)
+    return run, n
+
+
+def best_of(func, repeat):
+    best = np.inf
+    for _ in range(repeat):
+        with contextlib.redirect_stdout(io.StringIO()):
+            start = time.perf_counter()
+            func()
+            best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--minutes", type=float, nargs="+", default=[10, 60])
+    parser.add_argument("--only", nargs="+", choices=sorted(BENCHMARKS), default=None)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--save", default=None, help="write the results to this JSON file")
+    parser.add_argument("--compare", default=None, help="JSON results of an earlier run")
+    parser.add_argument("--threshold", type=float, default=1.25,
+                        help="slowdown factor reported as a regression (default: 1.25)")
+    args = parser.parse_args(argv)
+
+    # measure parsing too: no input cache, nothing written outside the temp dir
+    os.environ["BCG_CACHE_DIR"] = ""
+    baseline = {}
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+
+    results = {}
+    regressions = []
+    print(f"{'benchmark':<22} {'minutes':>7} {'samples':>10} {'best [s]':>9} {'samples/s':>13}")
+    for name in args.only or BENCHMARKS:
+        for minutes in args.minutes:
+            with tempfile.TemporaryDirectory() as tmp:
+                func, samples = BENCHMARKS[name](minutes, Path(tmp))
+                best = best_of(func, args.repeat)
+            key = f"{name}@{minutes:g}"
+            results[key] = {"seconds": best, "samples": samples, "samples_per_s": samples / best}
+            line = f"{name:<22} {minutes:7g} {samples:10d} {best:9.4f} {samples / best:13,.0f}"
+            if key in baseline:
+                ratio = best / baseline[key]["seconds"]
+                line += f"  {ratio:5.2f}x vs. saved"
+                if ratio > args.threshold:
+                    regressions.append(key)
+                    line += "  REGRESSION"
+            print(line)
+
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"Saved results to: {args.save}")
+    if regressions:
+        print(f"Regressions: {', '.join(regressions)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
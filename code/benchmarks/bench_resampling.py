@@ -0,0 +1,65 @@
+"""
+Benchmark of the resampling engines: speed and heart-rate accuracy.
+
+A synthetic recording at --fs-in is resampled to 50 Hz with the original
+np.interp path of resample_signal, the anti-aliased interpolation and the
+polyphase engine of resampling.py; the resampled signals then go through the
+usual filter + window HR estimation and are scored against the true HR.
+Wide-band noise above 25 Hz makes aliasing visible.
+
+    python -m benchmarks.bench_resampling [--minutes 60] [--fs-in 140]
+"""
+
+import argparse
+import time
+import numpy as np
+import pandas as pd
+import BCG_heartrate as BCG_hr
+import generate_timestamp_and_resampling as gtr
+import resampling
+from benchmarks.synthetic import synthetic_bcg
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--minutes", type=float, default=60)
+    parser.add_argument("--fs-in", type=float, default=140)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args(argv)
+
+    fs_out = 50.0
+    sig, hr = synthetic_bcg(args.minutes, args.fs_in)
+    rng = np.random.default_rng(2)
+    t = np.arange(sig.size) / args.fs_in
+    sig = sig + 150 * np.sin(2 * np.pi * 46.0 * t) + 60 * rng.standard_normal(sig.size)
+    t0 = 1699096655239
+    df = pd.DataFrame({
+        'BCG': sig.astype(np.int64),
+        'Timestamp': (t0 + np.arange(sig.size) * (1000.0 / args.fs_in)).astype(np.int64),
+        'fs': int(args.fs_in)
+    })
+
+    win_size = int(10 * fs_out)
+    engines = {
+        "np.interp (original)": lambda: gtr.resample_signal(df, fs_out)['BCG'].values,
+        "interp + anti-alias": lambda: resampling.resample(df['BCG'].values, t0, args.fs_in, fs_out, "interp")[1],
+        "polyphase": lambda: resampling.resample(df['BCG'].values, t0, args.fs_in, fs_out, "poly")[1],
+    }
+    print(f"{args.minutes:g} min at {args.fs_in:g} Hz -> {fs_out:g} Hz ({sig.size:,} samples)")
+    print(f"{'engine':<22} {'seconds':>8} {'Msamples/s':>11} {'HR MAE':>7}")
+    for name, run in engines.items():
+        best = np.inf
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            out = run()
+            best = min(best, time.perf_counter() - start)
+        bpm = BCG_hr.calculate_bpm_array(BCG_hr.compute_filtered_signal(out, fs_out), fs_out)
+        # true HR per output window, taken from the input-rate HR track
+        idx = (np.arange(bpm.size * win_size) * args.fs_in / fs_out).astype(int)
+        truth = hr[idx].reshape(-1, win_size).mean(axis=1)
+        mae = np.mean(np.abs(bpm - truth))
+        print(f"{name:<22} {best:>8.3f} {sig.size / best / 1e6:>11.1f} {mae:>7.2f}")
+
+
+if __name__ == "__main__":
+    main()
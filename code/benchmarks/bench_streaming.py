@@ -0,0 +1,45 @@
+"""
+Streaming vs. offline heart-rate throughput.
+
+Feeds a synthetic BCG recording to streaming.StreamingHeartRate in chunks of
+random size and times it against the offline zero-phase path
+(compute_filtered_signal + calculate_bpm_array). The agreement of the two
+paths is checked by tests/test_streaming.py.
+
+    python -m benchmarks.bench_streaming [--minutes 60] [--fs 50]
+"""
+
+import argparse
+import time
+import numpy as np
+import BCG_heartrate as BCG_hr
+from streaming import StreamingHeartRate
+from benchmarks.synthetic import synthetic_bcg
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--minutes", type=float, default=60)
+    parser.add_argument("--fs", type=float, default=50)
+    args = parser.parse_args(argv)
+
+    sig, _ = synthetic_bcg(args.minutes, args.fs)
+
+    start = time.perf_counter()
+    BCG_hr.calculate_bpm_array(BCG_hr.compute_filtered_signal(sig, args.fs), args.fs)
+    t_offline = time.perf_counter() - start
+
+    rng = np.random.default_rng(1)
+    cuts = np.cumsum(rng.integers(1, 2 * int(args.fs), sig.size // int(args.fs)))
+    processor = StreamingHeartRate(args.fs)
+    start = time.perf_counter()
+    n_windows = sum(len(processor.push(chunk)) for chunk in np.split(sig, cuts[cuts < sig.size]))
+    t_online = time.perf_counter() - start
+
+    print(f"windows: {n_windows}")
+    print(f"throughput: offline {sig.size / t_offline:,.0f} samples/s, "
+          f"streaming {sig.size / t_online:,.0f} samples/s")
+
+
+if __name__ == "__main__":
+    main()
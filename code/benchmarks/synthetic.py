@@ -0,0 +1,112 @@
+"""
+Synthetic microbend-fibre BCG recordings for benchmarks.
+
+synthetic_bcg() builds a raw BCG trace: heart beats at a slowly varying rate,
+chest movement from breathing, sensor noise and optional motion artifacts
+(large low-frequency bursts that saturate the ADC). write_recording() stores
+it in the layout of the dataset (a raw BCG CSV with t0 and fs on the first
+row, and a reference RR CSV with per-second heart rates), so the whole
+pipeline can be run without the private data:
+
+    python -m benchmarks.synthetic --out /tmp/synthetic --subjects 3 --minutes 30
+"""
+
+import argparse
+from pathlib import Path
+import numpy as np
+import pandas as pd
+
+ADC_MAX = 4095
+DEFAULT_T0_MS = 1699096655239
+
+
+def synthetic_bcg(minutes: float, fs: float = 50.0, hr_mean: float = 70.0, hr_swing: float = 10.0,
+                  hr_period_s: float = 300.0, resp_rate: float = 15.0, resp_amp: float = 200.0,
+                  beat_amp: float = 300.0, noise: float = 20.0, motion_per_hour: float = 0.0,
+                  seed: int = 0):
+    """Raw BCG samples and the true heart rate of every sample.
+
+    The heart rate follows hr_mean + hr_swing * sin(2 pi t / hr_period_s)
+    (bpm), breathing is a resp_rate breaths/min sinusoid of amplitude resp_amp
+    and noise is the standard deviation of white sensor noise, all in ADC
+    counts around a 2000 offset. motion_per_hour random 2-10 s motion bursts
+    are added and the result clipped to the 12-bit ADC range.
+    """
+    rng = np.random.default_rng(seed)
+    n = int(minutes * 60 * fs)
+    t = np.arange(n) / fs
+    hr = hr_mean + hr_swing * np.sin(2 * np.pi * t / hr_period_s)
+    phase = np.cumsum(hr / 60 / fs)
+    beats = np.sin(2 * np.pi * phase) ** 15
+    sig = (2000 + beat_amp * beats + resp_amp * np.sin(2 * np.pi * resp_rate / 60 * t)
+           + noise * rng.standard_normal(n))
+
+    n_motion = rng.poisson(motion_per_hour * minutes / 60) if motion_per_hour else 0
+    for _ in range(n_motion):
+        length = int(rng.uniform(2, 10) * fs)
+        start = rng.integers(0, max(1, n - length))
+        burst = np.cumsum(rng.standard_normal(length)) * 40 * np.hanning(length)
+        sig[start:start + length] += burst + 1500 * np.hanning(length) * rng.choice([-1, 1])
+    if n_motion:
+        np.clip(sig, 0, ADC_MAX, out=sig)
+    return sig, hr
+
+
+def write_recording(root, subject: str = "01", day: str = "20231105", minutes: float = 30.0,
+                    fs: float = 140.0, t0_ms: int = DEFAULT_T0_MS, rr_offset_s: int = 5,
+                    seed: int = 0, **signal_options):
+    """Write a raw BCG CSV and its reference RR CSV under root/<subject>/.
+
+    The RR reference starts rr_offset_s after the BCG and has two rows per
+    second (like the monitor export) with the true heart rate plus +-2 bpm
+    of rounding jitter. signal_options go to synthetic_bcg.
+    Returns (bcg_path, rr_path).
+    """
+    root = Path(root)
+    sig, hr = synthetic_bcg(minutes, fs=fs, seed=seed, **signal_options)
+    bcg_dir = root / subject / "BCG"
+    rr_dir = root / subject / "Reference" / "RR"
+    bcg_dir.mkdir(parents=True, exist_ok=True)
+    rr_dir.mkdir(parents=True, exist_ok=True)
+
+    n = sig.size
+    header = np.full(n, np.nan)
+    header[0] = t0_ms
+    fs_col = np.full(n, np.nan)
+    fs_col[0] = fs
+    bcg_path = bcg_dir / f"{subject}_{day}_BCG.csv"
+    pd.DataFrame({"BCG": np.round(sig), "Timestamp": header, "fs": fs_col}).to_csv(bcg_path, index=False)
+
+    rng = np.random.default_rng(seed + 1)
+    seconds = np.arange(rr_offset_s, int(n / fs))
+    rr_hr = np.repeat(hr[(seconds * fs).astype(np.int64)], 2) + rng.integers(-2, 3, 2 * seconds.size)
+    rows = np.repeat(t0_ms + seconds * 1000, 2)
+    rr_path = rr_dir / f"{subject}_{day}_RR.csv"
+    pd.DataFrame({
+        "Timestamp": pd.to_datetime(rows, unit="ms").strftime("%Y/%m/%d %H:%M:%S"),
+        "Heart Rate": np.round(rr_hr),
+        "RR Interval in seconds": np.round(60 / rr_hr, 3),
+    }).to_csv(rr_path, index=False)
+    return bcg_path, rr_path
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Write a synthetic BCG/RR dataset")
+    parser.add_argument("--out", required=True, help="dataset root (like dataset/data)")
+    parser.add_argument("--subjects", type=int, default=2)
+    parser.add_argument("--minutes", type=float, default=30)
+    parser.add_argument("--fs", type=float, default=140)
+    parser.add_argument("--noise", type=float, default=60)
+    parser.add_argument("--motion-per-hour", type=float, default=0)
+    args = parser.parse_args(argv)
+
+    for i in range(args.subjects):
+        bcg_path, rr_path = write_recording(
+            args.out, subject=f"{i + 1:02d}", day=f"202311{i + 5:02d}", minutes=args.minutes,
+            fs=args.fs, t0_ms=DEFAULT_T0_MS + i * 86_400_000, seed=i, noise=args.noise,
+            motion_per_hour=args.motion_per_hour)
+        print(f"Wrote {bcg_path} and {rr_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,61 @@
+import re
+import numpy as np
 import pandas as pd
 from pathlib import Path
 
+
+# character ranges of each strftime field in numpy's ISO 'YYYY-MM-DDTHH:MM:SS'
+_ISO_FIELDS = {'Y': (0, 4), 'm': (5, 7), 'd': (8, 10), 'H': (11, 13), 'M': (14, 16), 'S': (17, 19)}
+
+
+def format_timestamps_ms(
+    timestamps_ms,
+    time_format: str = '%Y/%m/%d %H:%M:%S'
+) -> np.ndarray:
+    """Format int64 epoch-ms timestamps (truncated to whole seconds) as strings.
+
+    Formats made of %Y %m %d %H %M %S and literal characters are assembled
+    from numpy's ISO representation as fixed-width character arrays, without
+    a per-element Python call; any other format falls back to strftime."""
+    seconds = np.asarray(timestamps_ms, dtype=np.int64).astype('datetime64[ms]').astype('datetime64[s]')
+    parts = re.split(r'(%.)', time_format)
+    if any(p.startswith('%') and p[1:] not in _ISO_FIELDS for p in parts) or \
+            (seconds.size and (seconds.min() < np.datetime64('1000-01-01') or
+                               seconds.max() > np.datetime64('9999-12-31T23:59:59'))):
+        return pd.to_datetime(seconds).strftime(time_format).to_numpy()
+
+    iso = np.datetime_as_string(seconds).astype('<U19')
+    codes = iso.view(np.uint32).reshape(-1, 19)
+    columns = []
+    for part in parts:
+        if part.startswith('%'):
+            lo, hi = _ISO_FIELDS[part[1:]]
+            columns.append(codes[:, lo:hi])
+        elif part:
+            literal = np.frombuffer(part.encode('utf-32-le'), dtype=np.uint32)
+            columns.append(np.broadcast_to(literal, (codes.shape[0], literal.size)))
+    out = np.ascontiguousarray(np.hstack(columns)) if columns else np.zeros((codes.shape[0], 0), np.uint32)
+    return out.view(f'<U{out.shape[1]}').ravel() if out.shape[1] else np.full(codes.shape[0], '')
+
+
+def export_with_formatted_timestamps(
+    df: pd.DataFrame,
+    output_csv: str | Path,
+    timestamp_col: str = 'Timestamp',
+    time_format: str = '%Y/%m/%d %H:%M:%S',
+    index: bool = False
+) -> None:
+    """Write df to CSV with its int64 epoch-ms timestamps formatted as strings.
+
+    timestamp_col is looked up in the columns first, then as the index name."""
+    df = df.copy()
+    if timestamp_col in df.columns:
+        df[timestamp_col] = format_timestamps_ms(df[timestamp_col].values, time_format)
+    else:
+        df.index = pd.Index(format_timestamps_ms(df.index.values, time_format), name=df.index.name)
+    df.to_csv(output_csv, index=index)
+
+
 def convert_timestamp_ms_to_str(
     input_csv: str | Path,
     output_csv: str | Path,
@@ -14,11 +69,14 @@ def convert_timestamp_ms_to_str(
         dtype={timestamp_col: 'Int64'}
     )
 
-    # 2) Convert ms → datetime, then format to string
-    df[timestamp_col] = (
-        pd.to_datetime(df[timestamp_col], unit='ms')
-          .dt.strftime(time_format)
-    )
+    # 2) Format ms → string (vectorized unless timestamps are missing)
+    if df[timestamp_col].isna().any():
+        df[timestamp_col] = (
+            pd.to_datetime(df[timestamp_col], unit='ms')
+              .dt.strftime(time_format)
+        )
+    else:
+        df[timestamp_col] = format_timestamps_ms(df[timestamp_col].to_numpy(np.int64), time_format)
 
     # 3) Save out the new CSV (only 'Time' and other columns remain)
     df.to_csv(output_csv, index=False)
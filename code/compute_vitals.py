@@ -6,6 +6,7 @@ Function to compute vitals, i.e., heart rate and respiration.
 import numpy as np
 
 from beat_to_beat import compute_rate
+from detect_peaks import detect_peaks, suppress_close_peaks
 
 
 def vitals(t1, t2, win_size, window_limit, sig, time, mpd, plot=0):
@@ -18,3 +19,179 @@ def vitals(t1, t2, win_size, window_limit, sig, time, mpd, plot=0):
         t2 += win_size
     all_rate = np.vstack(all_rate).flatten()
     return all_rate
+
+
+def vitals_vectorized(t1, t2, win_size, window_limit, sig, time, mpd, plot=0):
+    """Drop-in replacement for `vitals` that detects local maxima once.
+
+    Candidate peaks are found in a single pass over the analysed span and
+    labelled with their window; the minimum-peak-distance suppression then
+    runs once over all candidates with peaks of different windows kept apart,
+    so the result matches `vitals` window for window. Mean inter-peak
+    intervals are computed for all windows at once from `np.diff` sums.
+
+    `sig` may also be (channels, samples): the windows of all channels are
+    then analysed as one batch and a (channels, window_limit) array is
+    returned.
+    """
+    if np.ndim(sig) > 1:
+        sig = np.asarray(sig)
+        batch = sig[..., t1:t1 + window_limit * win_size].reshape(-1)
+        rates = vitals_vectorized(0, win_size, win_size, batch.size // win_size, batch, time, mpd)
+        return rates.reshape(sig.shape[:-1] + (window_limit,))
+    all_rate = np.zeros(window_limit)
+    if window_limit <= 0:
+        return all_rate
+    span = window_limit * win_size
+    x = np.atleast_1d(np.asarray(sig[t1:t1 + span], dtype=np.float64))
+
+    # local maxima of the whole span; a window's first and last sample cannot
+    # be peaks of that window
+    cand = detect_peaks(x, mpd=1)
+    pos = cand % win_size
+    cand = cand[(pos != 0) & (pos != win_size - 1)]
+
+    # minimum peak distance, applied within each window only
+    if cand.size and mpd > 1:
+        cand = suppress_close_peaks(x, cand, mpd, groups=cand // win_size)
+
+    # mean peak-to-peak interval per window; times are taken at the
+    # window-relative indices exactly as compute_rate does
+    win = cand // win_size
+    counts = np.bincount(win, minlength=window_limit)
+    peak_time = time[cand - win * win_size]
+    same = win[1:] == win[:-1]
+    sums = np.bincount(win[:-1][same], weights=np.diff(peak_time)[same],
+                       minlength=window_limit)
+    valid = counts > 1
+    mean_interval = sums[valid] / (counts[valid] - 1)
+    all_rate[valid] = np.round(1000 * (60 / mean_interval), decimals=2)
+    return all_rate
+
+
+# Rate estimators: name -> function(sig, fs, win_size, hop=None, **options)
+# returning one rate per window (0.0 where no rate could be estimated). hop
+# None means non-overlapping windows.
+ESTIMATORS = {}
+
+
+def register_estimator(name):
+    """Decorator adding a rate estimator to ESTIMATORS."""
+    def register(func):
+        ESTIMATORS[name] = func
+        return func
+    return register
+
+
+def estimate_rates(sig, fs, win_size, hop=None, method='peaks', **options):
+    """Rates of all windows of sig with the estimator registered as `method`."""
+    if method not in ESTIMATORS:
+        raise ValueError(f"Unknown rate estimator: {method}")
+    return ESTIMATORS[method](sig, fs, win_size, hop=hop, **options)
+
+
+@register_estimator('peaks')
+def peak_rates(sig, fs, win_size, hop=None, min_interval_sec=0.5):
+    """Mean beat-to-beat interval of the detected peaks (vitals_vectorized,
+    or vitals_sliding for overlapping windows)."""
+    mpd = int(min_interval_sec * fs)
+    n = np.shape(sig)[-1]
+    time = np.arange(n) * (1000 / fs)
+    if hop and hop != win_size:
+        return vitals_sliding(sig, time, win_size, hop, mpd)
+    return vitals_vectorized(0, win_size, win_size, n // win_size, sig, time, mpd)
+
+
+@register_estimator('spectral')
+def spectral_rates(sig, fs, win_size, hop=None, **options):
+    """Subharmonic-summation spectral rate of every window (spectral.spectral_rates)."""
+    import spectral
+    return spectral.spectral_rates(sig, fs, win_size, hop, **options)[0]
+
+
+@register_estimator('autocorr')
+def autocorr_rates(sig, fs, win_size, hop=None, **options):
+    """Autocorrelation peak of every window (spectral.autocorr_rates)."""
+    import spectral
+    return spectral.autocorr_rates(sig, fs, win_size, hop, **options)[0]
+
+
+@register_estimator('fusion')
+def fused_rates(sig, fs, win_size, hop=None, mode='fallback', min_quality=0.3,
+                max_diff=10.0, min_interval_sec=0.5):
+    """Peak engine fused with the autocorrelation engine.
+
+    mode 'fallback' keeps the peak rate and fills the windows where it is
+    0.0 with the autocorrelation rate when its quality reaches min_quality;
+    'mean' additionally averages the two where both are valid and agree
+    within max_diff per minute, and takes the autocorrelation rate where they
+    disagree and its quality is at least min_quality.
+    """
+    import spectral
+    if mode not in ('fallback', 'mean'):
+        raise ValueError(f"Unknown fusion mode: {mode}")
+    peaks = peak_rates(sig, fs, win_size, hop, min_interval_sec=min_interval_sec)
+    acf, quality = spectral.autocorr_rates(sig, fs, win_size, hop, min_quality=0.0)
+    n = min(peaks.shape[-1], acf.shape[-1])
+    fused, acf, quality = peaks[..., :n].copy(), acf[..., :n], quality[..., :n]
+    trusted = (acf > 0) & (quality >= min_quality)
+    missing = fused == 0
+    fused[missing & trusted] = acf[missing & trusted]
+    if mode == 'mean':
+        both = ~missing & (acf > 0)
+        agree = both & (np.abs(fused - acf) <= max_diff)
+        fused[agree] = np.round((fused[agree] + acf[agree]) / 2, decimals=2)
+        override = both & ~agree & trusted
+        fused[override] = acf[override]
+    return fused
+
+
+def vitals_sliding(sig, time, win_size, hop, mpd, window_limit=None):
+    """Rates over overlapping windows of win_size samples every hop samples.
+
+    Beats are detected once over the whole signal (minimum peak distance
+    applied globally); the interval sum of each window then comes from a
+    prefix sum over the beat-to-beat intervals, so every window costs O(1)
+    after two binary searches whatever the overlap. As in `vitals`, the
+    first and last sample of a window do not count as its beats. With
+    hop == win_size the windows are those of `vitals`, but beats near the
+    window edges may differ because suppression is not done per window.
+
+    `sig` may also be (channels, samples), giving (channels, window_limit)
+    rates: the channels are laid end to end and their beats detected in one
+    pass, with the minimum peak distance applied within each channel.
+    """
+    sig = np.asarray(sig)
+    n = sig.shape[-1]
+    if window_limit is None:
+        window_limit = (n - win_size) // hop + 1 if n >= win_size else 0
+    shape = sig.shape[:-1] + (max(window_limit, 0),)
+    all_rate = np.zeros(shape)
+    if window_limit <= 0:
+        return all_rate
+
+    span = (window_limit - 1) * hop + win_size
+    if sig.ndim > 1:
+        batch = np.asarray(sig[..., :span], dtype=np.float64).reshape(-1)
+        # local maxima of every channel; a channel's first and last sample
+        # cannot be beats, and beats of different channels never interact
+        beats = detect_peaks(batch, mpd=1)
+        pos = beats % span
+        beats = beats[(pos != 0) & (pos != span - 1)]
+        if beats.size and mpd > 1:
+            beats = suppress_close_peaks(batch, beats, mpd, groups=beats // span)
+    else:
+        beats = detect_peaks(np.atleast_1d(sig[:span]), mpd=mpd)
+    beat_time = time[beats % span]
+    csum = np.concatenate(([0.0], np.cumsum(np.diff(beat_time))))
+
+    # window starts of all channels on the end-to-end axis
+    starts = (np.arange(all_rate.size // window_limit)[:, None] * span
+              + np.arange(window_limit) * hop).ravel()
+    lo = np.searchsorted(beats, starts, side='right')
+    hi = np.searchsorted(beats, starts + win_size - 1, side='left')
+    counts = hi - lo
+    valid = counts > 1
+    mean_interval = (csum[hi[valid] - 1] - csum[lo[valid]]) / (counts[valid] - 1)
+    all_rate.reshape(-1)[valid] = np.round(1000 * (60 / mean_interval), decimals=2)
+    return all_rate
@@ -1,8 +1,8 @@
 """Detect peaks in data based on their amplitude and other features."""
 
 from __future__ import division, print_function
+from bisect import bisect_left, bisect_right
 import numpy as np
-import matplotlib.pyplot as plt
 
 __author__ = "Marcos Duarte, https://github.com/demotu/BMC"
 __version__ = "1.0.4"
@@ -74,7 +74,8 @@ def detect_peaks(x, mph=None, mpd=1, threshold=0, edge='rising',
     # >>> detect_peaks(x, threshold = 2, show=True)
     """
 
-    x = np.atleast_1d(x).astype('float64')
+    # no copy when x already is float64; it is only copied before being modified
+    x = np.atleast_1d(np.asarray(x, dtype=np.float64))
     if x.size < 3:
         return np.array([], dtype=int)
     if valley:
@@ -84,6 +85,8 @@ def detect_peaks(x, mph=None, mpd=1, threshold=0, edge='rising',
     # handle NaN's
     indnan = np.where(np.isnan(x))[0]
     if indnan.size:
+        if not valley:
+            x = x.copy()
         x[indnan] = np.inf
         dx[np.where(np.isnan(dx))[0]] = np.inf
     ine, ire, ife = np.array([[], [], []], dtype=int)
@@ -113,16 +116,7 @@ def detect_peaks(x, mph=None, mpd=1, threshold=0, edge='rising',
         ind = np.delete(ind, np.where(dx < threshold)[0])
     # detect small peaks closer than minimum peak distance
     if ind.size and mpd > 1:
-        ind = ind[np.argsort(x[ind])][::-1]  # sort ind by peak height
-        idel = np.zeros(ind.size, dtype=bool)
-        for i in range(ind.size):
-            if not idel[i]:
-                # keep peaks with the same height if kpsh is True
-                idel = idel | (ind >= ind[i] - mpd) & (ind <= ind[i] + mpd) \
-                              & (x[ind[i]] > x[ind] if kpsh else True)
-                idel[i] = 0  # Keep current peak
-        # remove the small peaks and sort back the indices by their occurrence
-        ind = np.sort(ind[~idel])
+        ind = suppress_close_peaks(x, ind, mpd, kpsh)
 
     if show:
         if indnan.size:
@@ -134,6 +128,47 @@ def detect_peaks(x, mph=None, mpd=1, threshold=0, edge='rising',
     return ind
 
 
+def suppress_close_peaks(x, ind, mpd, kpsh=False, groups=None):
+    """Remove peaks closer than `mpd` to a higher peak, see detect_peaks.
+
+    `ind` are sorted candidate peak indices into `x`; the surviving indices
+    are returned sorted by their occurrence. Peaks with different `groups`
+    labels (e.g. analysis windows) never suppress each other.
+
+    Candidates are visited from the highest to the lowest and a candidate
+    survives when no already kept peak lies within `mpd` samples, or, with
+    `kpsh`, no strictly higher one does. The kept peaks are held in a sorted
+    list searched with bisect, which makes the sweep O(k log k) in the number
+    k of candidates instead of O(k^2) full-length mask updates. Groups are
+    swept one after the other, each with its own short list. Peaks of equal
+    height are visited in order of occurrence, so the peaks kept in a group
+    do not depend on the candidates of the other groups.
+    """
+    ind = np.asarray(ind)
+    if ind.size < 2:
+        return ind
+    height = x[ind]
+    pos = ind.astype(np.int64)
+    groups = np.zeros(ind.size, dtype=np.int64) if groups is None else np.asarray(groups)
+    # by group, then by decreasing height, ties by position
+    order = np.lexsort((pos, -height, groups))
+    labels = groups[order]
+    keep = np.zeros(ind.size, dtype=bool)
+    current = None
+    for i, p, h, g in zip(order.tolist(), pos[order].tolist(), height[order].tolist(),
+                          labels.tolist()):
+        if g != current:
+            kept_pos, kept_height, current = [], [], g
+        lo = bisect_left(kept_pos, p - mpd)
+        hi = bisect_right(kept_pos, p + mpd, lo)
+        if lo == hi or (kpsh and not any(kh > h for kh in kept_height[lo:hi])):
+            j = bisect_left(kept_pos, p, lo, hi)
+            kept_pos.insert(j, p)
+            kept_height.insert(j, h)
+            keep[i] = True
+    return ind[keep]
+
+
 def _plot(x, mph, mpd, threshold, edge, valley, ax, ind):
     """Plot results of the detect_peaks function, see its help."""
     try:
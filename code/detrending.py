@@ -0,0 +1,129 @@
+"""
+Baseline (trend) estimators for long BCG recordings.
+
+Three estimators, each linear or near-linear in the signal length:
+
+- polynomial_trend: polynomial fit on an abscissa scaled to [-1, 1], either
+  over the whole signal or over overlapping segments that are blended with
+  triangular weights (a piecewise model of drift over hours);
+- moving_median_baseline: running median evaluated every window // 4 samples
+  and interpolated in between;
+- smoothness_priors_baseline: the smoothness-priors trend of Tarvainen et al.
+  (2002), solved as a banded (pentadiagonal) system.
+
+detrend(x, method, ...) subtracts the chosen baseline from the signal.
+"""
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+# windows per block in moving_median_baseline, bounds the temporary memory
+MEDIAN_BLOCK = 4096
+
+
+def _scaled_vandermonde(n: int, order: int) -> np.ndarray:
+    # abscissa in [-1, 1] keeps the normal equations well conditioned
+    u = np.linspace(-1.0, 1.0, n) if n > 1 else np.zeros(n)
+    return np.vander(u, order + 1)
+
+
+def polynomial_trend(x: np.ndarray, order: int = 3, segment: int = None) -> np.ndarray:
+    """Polynomial trend of x.
+
+    Without segment a single polynomial of the given order is fitted to the
+    whole signal. With segment (samples) polynomials are fitted to windows of
+    that length with a hop of segment // 2, all in one matrix product against
+    the shared pseudo-inverse, and blended with triangular weights."""
+    x = np.asarray(x, dtype=np.float64)
+    n = x.size
+    if segment is None or segment >= n:
+        V = _scaled_vandermonde(n, order)
+        coef, *_ = np.linalg.lstsq(V, x, rcond=None)
+        return V @ coef
+
+    segment = max(int(segment), order + 2)
+    hop = max(1, segment // 2)
+    starts = np.arange(0, n - segment + 1, hop)
+    if starts[-1] != n - segment:
+        starts = np.append(starts, n - segment)
+
+    V = _scaled_vandermonde(segment, order)
+    fits = (sliding_window_view(x, segment)[starts] @ np.linalg.pinv(V).T) @ V.T
+
+    weight = 1.0 - np.abs(np.linspace(-1.0, 1.0, segment)) + 1e-3
+    trend = np.zeros(n)
+    total = np.zeros(n)
+    for start, fit in zip(starts, fits):
+        trend[start:start + segment] += weight * fit
+        total[start:start + segment] += weight
+    return trend / total
+
+
+def moving_median_baseline(x: np.ndarray, window: int) -> np.ndarray:
+    """Running median over `window` samples (reflected at the edges).
+
+    The median is evaluated every window // 4 samples and linearly
+    interpolated in between, so the cost is O(n) instead of O(n * window)."""
+    x = np.asarray(x, dtype=np.float64)
+    n = x.size
+    window = max(1, min(int(window), n))
+    hop = max(1, window // 4)
+    half = window // 2
+    padded = np.pad(x, (half, window - 1 - half), mode='reflect' if n > 1 else 'edge')
+    views = sliding_window_view(padded, window)
+
+    centers = np.arange(0, n, hop)
+    if centers[-1] != n - 1:
+        centers = np.append(centers, n - 1)
+    medians = np.empty(centers.size)
+    for i in range(0, centers.size, MEDIAN_BLOCK):
+        medians[i:i + MEDIAN_BLOCK] = np.median(views[centers[i:i + MEDIAN_BLOCK]], axis=1)
+    return np.interp(np.arange(n), centers, medians)
+
+
+def lambda_for_cutoff(fs: float, cutoff_hz: float) -> float:
+    """Smoothness parameter whose trend keeps roughly the content below cutoff_hz."""
+    return (fs / (2 * np.pi * cutoff_hz)) ** 2
+
+
+def smoothness_priors_baseline(x: np.ndarray, lam: float) -> np.ndarray:
+    """Smoothness-priors trend z = (I + lam^2 D2' D2)^-1 x.
+
+    D2 is the second-difference operator; the system is symmetric positive
+    definite and pentadiagonal, so it is solved in O(n) with a banded
+    Cholesky factorization."""
+    from scipy.linalg import solveh_banded
+    x = np.asarray(x, dtype=np.float64)
+    n = x.size
+    if n < 3:
+        return x.copy()
+    l2 = float(lam) ** 2
+    # lower banded form of I + l2 * D2'D2
+    ab = np.zeros((3, n))
+    ab[0] = 6.0
+    ab[0, [0, -1]] = 1.0
+    ab[0, [1, -2]] = 5.0
+    if n == 3:
+        ab[0, 1] = 4.0
+    ab[0] = 1.0 + l2 * ab[0]
+    ab[1, :-1] = -4.0
+    ab[1, [0, n - 2]] = -2.0
+    ab[1, :-1] *= l2
+    ab[2, :-2] = l2
+    return solveh_banded(ab, x, lower=True)
+
+
+def detrend(x: np.ndarray, method: str = 'poly', **kwargs) -> np.ndarray:
+    """Subtract the baseline estimated by `method` ('poly', 'median' or 'priors').
+
+    kwargs go to polynomial_trend (order, segment), moving_median_baseline
+    (window) or smoothness_priors_baseline (lam)."""
+    estimators = {
+        'poly': polynomial_trend,
+        'median': moving_median_baseline,
+        'priors': smoothness_priors_baseline,
+    }
+    if method not in estimators:
+        raise ValueError(f"Unknown detrending method: {method}")
+    x = np.asarray(x, dtype=np.float64)
+    return x - estimators[method](x, **kwargs)
@@ -1,45 +1,188 @@
+import math
 import pandas as pd
 import numpy as np
+import input_cache
+import resampling
+from records import Recording, as_counts, offsets_from
 
-def load_and_expand_timestamps(file_path: str) -> pd.DataFrame:
-    """Loads BCG CSV, fills in missing timestamps using fs."""
+def parse_bcg_csv(file_path) -> tuple[dict, dict]:
+    """Parses a raw BCG CSV into its sample column and the (t0, fs) header.
+
+    Samples are kept as float32 when that is lossless (integer ADC counts)."""
     df = pd.read_csv(file_path, header=0, names=['BCG', 'Timestamp', 'fs'],
                      dtype={'BCG': float, 'Timestamp': float, 'fs': float})
-    
-    t0 = df.loc[0, 'Timestamp']
-    fs = df.loc[0, 'fs']
+    bcg = df['BCG'].values
+    bcg32 = bcg.astype(np.float32)
+    if np.array_equal(bcg32, bcg, equal_nan=True):
+        bcg = bcg32
+    return {'BCG': bcg}, {'t0': float(df.loc[0, 'Timestamp']), 'fs': float(df.loc[0, 'fs'])}
+
+def load_recording(file_path: str) -> Recording:
+    """Loads BCG CSV (through the binary input cache) into a compact Recording
+    (float32 counts, int32 ms offsets), filling in timestamps using fs."""
+    columns, header = input_cache.load_columns(file_path, parse_bcg_csv, tag='bcg')
+    bcg = columns['BCG']
+
+    t0 = header['t0']
+    fs = header['fs']
     dt_ms = 1000.0 / fs
-    offsets = np.arange(len(df)) * dt_ms
-    df['Timestamp'] = t0 + offsets
-    df['fs'] = fs
-    df['Timestamp'] = df['Timestamp'].astype(np.int64)
-    df['BCG'] = df['BCG'].astype(np.int64)
-    df['fs'] = df['fs'].astype(np.int64)
-    
-    return df
+    offsets = np.arange(len(bcg)) * dt_ms
+    return Recording.from_timestamps((t0 + offsets).astype(np.int64), as_counts(bcg), fs)
+
+def load_and_expand_timestamps(file_path: str) -> pd.DataFrame:
+    """Loads BCG CSV (through the binary input cache), fills in missing timestamps using fs."""
+    return load_recording(file_path).to_frame()
 
 def save_dataframe(df: pd.DataFrame, output_path: str):
     """Saves the DataFrame to CSV."""
     df.to_csv(output_path, index=False)
     print(f"Saved file: {output_path}")
 
-def resample_signal(df: pd.DataFrame, fs_new: float) -> pd.DataFrame:
-    """Resamples the BCG signal to a new sampling rate."""
-    timestamps = df['Timestamp'].values.astype(np.float64)
-    signal = df['BCG'].values
+def resample_signal(df: pd.DataFrame, fs_new: float, method: str = 'interp') -> pd.DataFrame:
+    """Resamples the BCG signal to a new sampling rate.
+
+    method 'interp' is the original plain linear interpolation; 'poly' and
+    'auto' use the anti-aliased engine in resampling.py."""
+    return resample_recording(Recording.from_frame(df), fs_new, method=method).to_frame()
+
+def resample_recording(recording: Recording, fs_new: float, method: str = 'interp') -> Recording:
+    """resample_signal on a Recording; the result is a Recording too."""
+    if method != 'interp':
+        new_timestamps, new_signal = resampling.resample(
+            recording.bcg, recording.t0_ms, float(recording.fs), fs_new, method=method)
+        return Recording.from_timestamps(new_timestamps, as_counts(new_signal), float(fs_new))
+
+    timestamps = recording.timestamps.astype(np.float64)
+    signal = recording.bcg
     
     dt_new_ms = 1000.0 / fs_new
     t_start, t_end = timestamps[0], timestamps[-1]
     new_timestamps = np.arange(t_start, t_end, dt_new_ms)
     new_signal = np.interp(new_timestamps, timestamps, signal)
     
-    df_resampled = pd.DataFrame({
-        'BCG': new_signal.astype(np.int64),
-        'Timestamp': new_timestamps.astype(np.int64),
-        'fs': int(fs_new)
-    })
-    
-    return df_resampled
+    return Recording.from_timestamps(new_timestamps.astype(np.int64), as_counts(new_signal),
+                                     float(fs_new))
+
+def iter_bcg_chunks(file_path: str, chunk_size: int = 1_000_000):
+    """Yields (timestamps, samples) blocks of a raw BCG CSV.
+
+    Timestamps are rebuilt from the first row's t0/fs exactly as in
+    load_and_expand_timestamps, without holding the whole file in memory."""
+    reader = pd.read_csv(file_path, header=0, names=['BCG', 'Timestamp', 'fs'],
+                         dtype={'BCG': float, 'Timestamp': float, 'fs': float},
+                         chunksize=chunk_size)
+    start = 0
+    for chunk in reader:
+        if start == 0:
+            t0 = chunk['Timestamp'].iloc[0]
+            dt_ms = 1000.0 / chunk['fs'].iloc[0]
+        offsets = np.arange(start, start + len(chunk)) * dt_ms
+        yield (t0 + offsets).astype(np.int64), chunk['BCG'].values.astype(np.int64)
+        start += len(chunk)
+
+def resample_chunks(chunks, fs_new: float):
+    """Resamples (timestamps, samples) blocks onto the grid of resample_signal.
+
+    The last input sample of each block is carried into the next one so grid
+    points between blocks are interpolated from the same two neighbours as in
+    the whole-signal version; the output blocks concatenate to exactly
+    resample_signal's result."""
+    dt_new_ms = 1000.0 / fs_new
+    t_start = None
+    k = 0  # index of the next grid point to emit
+    carry_t = carry_x = None
+    for timestamps, signal in chunks:
+        if len(timestamps) == 0:
+            continue
+        timestamps = timestamps.astype(np.float64)
+        if t_start is None:
+            t_start = timestamps[0]
+        else:
+            timestamps = np.concatenate(([carry_t], timestamps))
+            signal = np.concatenate(([carry_x], signal))
+        # grid points strictly before the block's last sample
+        k_end = max(k, math.ceil((timestamps[-1] - t_start) / dt_new_ms))
+        new_timestamps = t_start + np.arange(k, k_end) * dt_new_ms
+        if new_timestamps.size:
+            yield new_timestamps, np.interp(new_timestamps, timestamps, signal)
+        k = k_end
+        carry_t, carry_x = timestamps[-1], signal[-1]
+
+def read_bcg_header(file_path: str) -> tuple[float, float]:
+    """Returns (t0, fs) from the first row of a raw BCG CSV."""
+    head = pd.read_csv(file_path, header=0, names=['BCG', 'Timestamp', 'fs'], dtype=float, nrows=1)
+    return head['Timestamp'].iloc[0], head['fs'].iloc[0]
+
+def polyphase_chunks(file_path: str, fs_new: float, chunk_size: int = 1_000_000):
+    """Block-wise polyphase counterpart of resample_chunks (see resampling.py)."""
+    t0, fs = read_bcg_header(file_path)
+    ratio = resampling.rational_ratio(fs, fs_new)
+    if ratio is None:
+        raise ValueError(f"No polyphase ratio for {fs} Hz -> {fs_new} Hz")
+    samples = (signal for _, signal in iter_bcg_chunks(file_path, chunk_size))
+    k = 0
+    for new_signal in resampling.polyphase_blocks(samples, *ratio, block_size=chunk_size):
+        yield resampling.time_grid_ms(int(t0), new_signal.size, fs_new, start=k), new_signal
+        k += new_signal.size
+
+def resample_file_chunked(file_path: str, fs_new: float, output_path: str = None,
+                          chunk_size: int = 1_000_000, method: str = 'interp'):
+    """Loads and resamples a raw BCG CSV block by block.
+
+    With output_path the rows are appended to that CSV as they are produced
+    (same format as save_dataframe) and the row count is returned; otherwise
+    the resampled DataFrame is returned. Either way memory use is bounded by
+    the block size plus the (much smaller) resampled output. method 'poly'
+    resamples with the polyphase engine instead of interpolation, 'auto' does
+    so whenever the rate ratio allows it."""
+    blocks = _resampled_blocks(file_path, fs_new, chunk_size, method)
+    frames = []
+    n_rows = 0
+    for new_timestamps, new_signal in blocks:
+        block = pd.DataFrame({
+            'BCG': new_signal.astype(np.int64),
+            'Timestamp': new_timestamps.astype(np.int64),
+            'fs': float(fs_new)
+        })
+        if output_path is None:
+            frames.append(block)
+        else:
+            block.to_csv(output_path, mode='w' if n_rows == 0 else 'a',
+                         header=n_rows == 0, index=False)
+        n_rows += len(block)
+    if output_path is not None:
+        print(f"Saved file: {output_path}")
+        return n_rows
+    if not frames:
+        return pd.DataFrame({'BCG': np.array([], dtype=np.int64),
+                             'Timestamp': np.array([], dtype=np.int64), 'fs': float(fs_new)})
+    return pd.concat(frames, ignore_index=True)
+
+def resample_file_recording(file_path: str, fs_new: float, chunk_size: int = 1_000_000,
+                            method: str = 'interp') -> Recording:
+    """resample_file_chunked into a compact Recording: each block is reduced
+    to float32 counts and int32 offsets as soon as it is produced."""
+    t0 = None
+    offsets, samples = [], []
+    for new_timestamps, new_signal in _resampled_blocks(file_path, fs_new, chunk_size, method):
+        new_timestamps = new_timestamps.astype(np.int64)
+        if t0 is None:
+            t0 = int(new_timestamps[0])
+        offsets.append(offsets_from(new_timestamps, t0))
+        samples.append(as_counts(new_signal))
+    if t0 is None:
+        return Recording(0, float(fs_new), np.empty(0), np.empty(0))
+    return Recording(t0, float(fs_new), np.concatenate(offsets), np.concatenate(samples))
+
+def _resampled_blocks(file_path: str, fs_new: float, chunk_size: int, method: str):
+    if method == 'auto':
+        fs = read_bcg_header(file_path)[1]
+        method = 'poly' if resampling.rational_ratio(fs, fs_new) else 'interp'
+    if method == 'interp':
+        return resample_chunks(iter_bcg_chunks(file_path, chunk_size), fs_new)
+    if method == 'poly':
+        return polyphase_chunks(file_path, fs_new, chunk_size)
+    raise ValueError(f"Unknown resampling method: {method}")
 
 # # === Example Usage ===
 # input_path = r'C:\Users\20111\Downloads\capsule\dataset\data\09\BCG\09_20231110_BCG.csv'
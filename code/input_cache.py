@@ -0,0 +1,137 @@
+"""
+On-disk binary cache for the raw BCG and RR input CSVs.
+
+The first time a CSV is read its parsed columns are stored as .npy files;
+later runs memory-map them instead of parsing the text again. Entries are
+keyed by the source path, its mtime and size, and the parser tag, so editing
+or replacing a CSV invalidates its entry automatically.
+
+The cache lives in $BCG_CACHE_DIR (default code/My_results/.cache); setting
+the variable to an empty string disables it.
+
+    python input_cache.py stats          # list the cached entries
+    python input_cache.py clear [CSV...] # drop all entries, or those of CSV...
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import uuid
+from pathlib import Path
+import numpy as np
+
+DEFAULT_CACHE_DIR = "code/My_results/.cache"
+
+_stats = {"hits": 0, "misses": 0}
+
+
+def cache_dir():
+    """The cache directory, or None when caching is disabled."""
+    path = os.environ.get("BCG_CACHE_DIR", DEFAULT_CACHE_DIR)
+    return Path(path) if path else None
+
+
+def cache_stats() -> dict:
+    """Hits and misses of this process since the last reset_stats()."""
+    return dict(_stats)
+
+
+def reset_stats():
+    _stats["hits"] = 0
+    _stats["misses"] = 0
+
+
+def _entry_dir(root: Path, source: Path, tag: str) -> Path:
+    st = source.stat()
+    key = f"{source.resolve()}|{st.st_mtime_ns}|{st.st_size}|{tag}"
+    digest = hashlib.sha1(key.encode("utf-8")).hexdigest()[:16]
+    return root / f"{source.stem}-{tag}-{digest}"
+
+
+def load_columns(source, parse, tag: str):
+    """Return (columns, meta) of `source`, calling `parse(source)` on a miss.
+
+    `parse` must return a dict of 1-D NumPy arrays and a JSON-serialisable
+    dict of scalars. Cached columns are returned as read-only memmaps.
+    """
+    root = cache_dir()
+    if root is None:
+        return parse(source)
+
+    source = Path(source)
+    entry = _entry_dir(root, source, tag)
+    meta_path = entry / "meta.json"
+    if meta_path.is_file():
+        _stats["hits"] += 1
+        with open(meta_path, encoding="utf-8") as f:
+            stored = json.load(f)
+        columns = {name: np.load(entry / f"{i}.npy", mmap_mode="r")
+                   for i, name in enumerate(stored["columns"])}
+        return columns, stored["meta"]
+
+    _stats["misses"] += 1
+    columns, meta = parse(source)
+
+    # write to a private directory first so concurrent workers never see a
+    # half-written entry
+    tmp = root / f".tmp-{uuid.uuid4().hex}"
+    tmp.mkdir(parents=True)
+    for i, values in enumerate(columns.values()):
+        np.save(tmp / f"{i}.npy", np.ascontiguousarray(values))
+    with open(tmp / "meta.json", "w", encoding="utf-8") as f:
+        json.dump({"source": str(source.resolve()), "columns": list(columns), "meta": meta}, f)
+    try:
+        os.replace(tmp, entry)
+    except OSError:
+        # another process stored the same entry first
+        shutil.rmtree(tmp, ignore_errors=True)
+    return columns, meta
+
+
+def _entries(root: Path):
+    for meta_path in sorted(root.glob("*/meta.json")):
+        with open(meta_path, encoding="utf-8") as f:
+            yield meta_path.parent, json.load(f)
+
+
+def clear(sources=None) -> int:
+    """Remove all cache entries, or only those built from `sources`."""
+    root = cache_dir()
+    if root is None or not root.is_dir():
+        return 0
+    wanted = None if not sources else {str(Path(s).resolve()) for s in sources}
+    removed = 0
+    for entry, stored in list(_entries(root)):
+        if wanted is None or stored["source"] in wanted:
+            shutil.rmtree(entry)
+            removed += 1
+    return removed
+
+
+def main(argv=None):
+    import argparse
+    parser = argparse.ArgumentParser(description="Manage the raw CSV cache")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("stats", help="list the cached entries")
+    clear_parser = sub.add_parser("clear", help="invalidate cached entries")
+    clear_parser.add_argument("sources", nargs="*", help="source CSVs (default: all)")
+    args = parser.parse_args(argv)
+
+    root = cache_dir()
+    if root is None:
+        print("Cache disabled (BCG_CACHE_DIR is empty)")
+        return
+    if args.command == "clear":
+        print(f"Removed {clear(args.sources)} entries from {root}")
+    else:
+        total = 0
+        for entry, stored in (_entries(root) if root.is_dir() else []):
+            size = sum(f.stat().st_size for f in entry.iterdir())
+            total += size
+            print(f"{size / 1e6:10.1f} MB  {stored['source']}")
+        print(f"{total / 1e6:10.1f} MB  total in {root}")
+
+
+if __name__ == "__main__":
+    main()
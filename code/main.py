@@ -1,11 +1,15 @@
+import argparse
+import contextlib
+import os
+import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from pathlib import Path
 import pandas as pd
-import generate_timestamp_and_resampling as gtr
-import BCG_heartrate as BCG_hr
-import change_timestamp as ct
-import synchronization as sync
 import Mean_error as er
-import plotting as pl
+import rendering
+import profiling
+import input_cache
+import pipeline
 
 DATA_ROOT    = Path("dataset/data")
 RESULTS_ROOT = Path("code/My_results")
@@ -36,65 +40,84 @@ def find_csv_pairs(subject_dir: Path):
     return pairs
 
 
-def process_pair(subject_id: str, bcg_path: Path, rr_path: Path):
+# statuses of pairs whose numeric results are complete
+NUMERIC_OK = ("ok", "plot_failed")
+
+
+def pair_dir(subject_id: str, prefix: str) -> Path:
+    return RESULTS_ROOT / subject_id / prefix
+
+
+def process_pair(subject_id: str, bcg_path: Path, rr_path: Path, **options):
     # Use first-11-character prefix to name folder
     prefix = bcg_path.stem[:11]
-    out_dir = RESULTS_ROOT / subject_id / prefix
+    out_dir = pair_dir(subject_id, prefix)
     out_dir.mkdir(parents=True, exist_ok=True)
 
     print(f"→ Processing {subject_id}/{prefix}")
-
-    # 1) Timestamp generation & 50 Hz resampling
-    ts_csv = out_dir / f"{prefix}_bcg_timestamp.csv"
-    df0 = gtr.load_and_expand_timestamps(str(bcg_path))
-    df1 = gtr.resample_signal(df0, fs_new=50.0)
-    gtr.save_dataframe(df1, str(ts_csv))
-
-    # 2) BCG → Heart rate (BPM)
-    hr_csv = out_dir / f"{prefix}_bcg_hr.csv"
-    sig, times = BCG_hr.load_bcg_data(str(ts_csv))
-    filt = BCG_hr.compute_filtered_signal(sig, fs=50)
-    bpm = BCG_hr.calculate_bpm_array(filt, fs=50, win_sec=10)
-    bpm_df = BCG_hr.build_bpm_dataframe(bpm, times, fs=50, win_sec=10)
-    BCG_hr.save_bpm_to_csv(bpm_df, str(hr_csv))
-    BCG_hr.plot_bpm_over_time(bpm_df, str(hr_csv))
-
-    # 3) Convert timestamp formatting
-    ts_fmt_csv = out_dir / f"{prefix}_bcg_hr_ts_fmt.csv"
-    ct.convert_timestamp_ms_to_str(
-        input_csv = str(hr_csv),
-        output_csv= str(ts_fmt_csv),
-        timestamp_col='Timestamp'
-    )
-
-    # 4) Synchronize with RR
-    sync_bcg = out_dir / f"{prefix}_hr_sync.csv"
-    sync_rr  = out_dir / f"{prefix}_rr_sync.csv"
-    sync.synchronize_signals(
-        bcg_path        = str(ts_fmt_csv),
-        rr_path         = str(rr_path),
-        output_bcg_path = str(sync_bcg),
-        output_rr_path  = str(sync_rr)
-    )
-
-    # 5) Calculate Mean error on these specific synced files
-    er.evaluate_heart_rate(
-        reference_csv_path = str(sync_rr),
-        estimated_csv_path = str(sync_bcg)
-    )
-
-    # 6) Final analysis plot
-    pl.plot_hr_analysis(
-        reference_csv_path = str(sync_rr),
-        estimated_csv_path = str(sync_bcg),
-        save_path = str(out_dir / f"{prefix}_analysis.png")
-    )
+    metrics = pipeline.run_pipeline(bcg_path, rr_path, out_dir, prefix,
+                                    fs_new=50.0, win_sec=10, **options)
     print(f" ✔ Completed {subject_id}/{prefix}")
+    return metrics
+
+
+def run_pair_job(subject_id: str, bcg_path: Path, rr_path: Path, options: dict) -> dict:
+    """Run process_pair with its output captured in the pair's own log file.
+
+    `options` are passed on to pipeline.run_pipeline.
+
+    Never raises: a failing recording is reported in the returned record
+    so the rest of the cohort keeps going. A pair whose numbers are complete
+    but whose plots failed is marked as plot_failed.
+    """
+    prefix = bcg_path.stem[:11]
+    out_dir = pair_dir(subject_id, prefix)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    record = {"Subject": subject_id, "Prefix": prefix, "Status": "ok", "Error": ""}
+    input_cache.reset_stats()
+
+    with open(out_dir / "output.txt", "w", encoding="utf-8") as log, \
+            contextlib.redirect_stdout(log), contextlib.redirect_stderr(log):
+        try:
+            metrics = process_pair(subject_id, bcg_path, rr_path, **options)
+            record.update(metrics.as_dict())
+            for error in record.pop("PlotErrors", []):
+                mark_plot_failed(record, error)
+        except Exception as exc:
+            traceback.print_exc()
+            record["Status"] = "failed"
+            record["Error"] = f"{type(exc).__name__}: {exc}"
+    stats = input_cache.cache_stats()
+    record["CacheHits"], record["CacheMisses"] = stats["hits"], stats["misses"]
+    return record
+
+
+def mark_plot_failed(record: dict, error: str):
+    record["Status"] = "plot_failed"
+    record["Error"] = "; ".join(filter(None, [record["Error"], error]))
+
 
+def render_plot_jobs(records: list, workers: int = 1):
+    """Render the deferred plots of all records, each logged to its pair's
+    output.txt; pairs with a failing plot are marked as plot_failed."""
+    plot_jobs = [(r, job) for r in records for job in r.pop("PlotJobs", [])]
+    if not plot_jobs:
+        return
+    print(f"\nRendering {len(plot_jobs)} deferred plots on {workers} worker(s)")
+    errors = rendering.render_deferred(
+        [job for _, job in plot_jobs], workers=workers,
+        logs=[pair_dir(r["Subject"], r["Prefix"]) / "output.txt" for r, _ in plot_jobs])
+    for (record, _), error in zip(plot_jobs, errors):
+        if error:
+            mark_plot_failed(record, error)
+            print(f" ✘ {record['Subject']}/{record['Prefix']} plot: {error}")
 
-def main():
-    for subject in sorted(DATA_ROOT.iterdir()):
-        if not subject.is_dir(): 
+
+def collect_jobs(data_root: Path) -> list[tuple[str, Path, Path]]:
+    """List every (subject, BCG, RR) pair found under data_root."""
+    jobs = []
+    for subject in sorted(data_root.iterdir()):
+        if not subject.is_dir():
             continue
 
         print(f"\nSubject {subject.name}:")
@@ -104,8 +127,148 @@ def main():
             continue
 
         for bcg_file, rr_file in pairs:
-            print(f"→ Processing subject {subject.name}, prefix {bcg_file.stem[:11]}")
-            process_pair(subject.name, bcg_file, rr_file)
+            jobs.append((subject.name, bcg_file, rr_file))
+    return jobs
+
+
+def run_batch(jobs, workers: int = 1, options: dict = None):
+    """Process all jobs on a pool of worker processes and summarise the cohort.
+
+    Returns the per-pair summary, the cohort metrics table (per pair and
+    pooled, see Mean_error.cohort_metrics) of the pairs that succeeded and
+    the per-stage timing roll-up (profiling.rollup)."""
+    options = options or {}
+    records = []
+
+    def report(record):
+        mark = "✔" if record["Status"] == "ok" else "✘"
+        print(f" {mark} {record['Subject']}/{record['Prefix']} {record['Error']}")
+        records.append(record)
+
+    if workers <= 1:
+        for job in jobs:
+            report(run_pair_job(*job, options))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(run_pair_job, *job, options) for job in jobs]
+            for future in as_completed(futures):
+                report(future.result())
+
+    # deferred plots are rendered once all the numbers are in
+    render_plot_jobs(records, workers)
+
+    summary = pd.DataFrame(records, columns=["Subject", "Prefix", "Status",
+                                             "MAE", "RMSE", "MAPE", "Artifacts",
+                                             "Bias", "LoA_low", "LoA_high", "Pearson_r",
+                                             "BR_min", "BR_max", "BR_mean",
+                                             "StagesRun", "StagesReused",
+                                             "CacheHits", "CacheMisses", "Error"])
+    summary = summary.sort_values(["Subject", "Prefix"]).reset_index(drop=True)
+
+    ok = [r for r in records if r["Status"] in NUMERIC_OK]
+    ok.sort(key=lambda r: (r["Subject"], r["Prefix"]))
+    cohort = er.cohort_metrics([f"{r['Subject']}/{r['Prefix']}" for r in ok],
+                               [r["HR_ref"] for r in ok], [r["HR_est"] for r in ok])
+    per_pair = cohort.iloc[:-1]
+    for column in ["Bias", "LoA_low", "LoA_high", "Pearson_r"]:
+        summary.loc[summary["Status"].isin(NUMERIC_OK), column] = per_pair[column].values
+    stages = profiling.rollup(rec for r in ok for rec in r.get("Stages", []))
+    return summary, cohort, stages
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="BCG heart-rate pipeline")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="number of worker processes (default: 1)")
+    parser.add_argument("--debug-dump", action="store_true",
+                        help="also write the intermediate per-stage CSVs")
+    parser.add_argument("--chunk-size", type=int, default=None,
+                        help="load and resample the raw BCG in blocks of this many "
+                             "rows to bound memory on very long recordings")
+    parser.add_argument("--resample-method", choices=["interp", "poly", "auto"],
+                        default="interp",
+                        help="resampler: plain interpolation (default), anti-aliased "
+                             "polyphase, or polyphase whenever the rate ratio allows")
+    parser.add_argument("--hop-sec", type=float, default=None,
+                        help="start a 10 s heart-rate window every this many seconds "
+                             "(default: non-overlapping windows)")
+    parser.add_argument("--estimator", choices=["peaks", "spectral", "autocorr", "fusion"],
+                        default="peaks",
+                        help="heart-rate engine: peak counting (default), spectral, "
+                             "autocorrelation, or peaks with autocorrelation fallback")
+    parser.add_argument("--hr-workers", type=int, default=1,
+                        help="filter and estimate the heart rate of each recording in "
+                             "this many segments in parallel (default: 1)")
+    parser.add_argument("--hr-executor", choices=["thread", "process"], default="thread",
+                        help="pool used by --hr-workers (default: thread)")
+    parser.add_argument("--keep-artifacts", action="store_true",
+                        help="estimate the heart rate of motion/clipping windows too "
+                             "instead of masking them")
+    parser.add_argument("--sync-tolerance-ms", type=int, default=0,
+                        help="align BCG and RR timestamps that differ by up to this "
+                             "many ms (default: exact matches of the BCG timestamps "
+                             "truncated to whole seconds)")
+    parser.add_argument("--no-breathing", action="store_true",
+                        help="skip the respiration-rate stage")
+    parser.add_argument("--plots", choices=rendering.PLOT_MODES, default="full",
+                        help="render plots per pair (full, default), after all pairs "
+                             "on the worker pool (deferred), or not at all (off)")
+    parser.add_argument("--no-plots", dest="plots", action="store_const", const="off",
+                        help="same as --plots off")
+    parser.add_argument("--plot-dpi", type=int, default=rendering.DEFAULT_DPI,
+                        help=f"resolution of the saved plots (default: {rendering.DEFAULT_DPI})")
+    parser.add_argument("--force", action="store_true",
+                        help="re-run every stage instead of reusing the results of "
+                             "unchanged stages from the previous run")
+    parser.add_argument("--cprofile", action="store_true",
+                        help="also dump a cProfile of the slowest stage of every pair")
+    parser.add_argument("--cache-dir", default=None,
+                        help="binary cache for the raw CSVs (default: $BCG_CACHE_DIR "
+                             f"or {input_cache.DEFAULT_CACHE_DIR})")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="always parse the raw CSVs")
+    args = parser.parse_args(argv)
+    # the environment is inherited by the worker processes
+    if args.no_cache:
+        os.environ["BCG_CACHE_DIR"] = ""
+    elif args.cache_dir:
+        os.environ["BCG_CACHE_DIR"] = args.cache_dir
+
+    jobs = collect_jobs(DATA_ROOT)
+    print(f"\nProcessing {len(jobs)} pairs on {args.workers} worker(s)")
+    options = {"debug_dump": args.debug_dump, "chunk_size": args.chunk_size,
+               "resample_method": args.resample_method, "hop_sec": args.hop_sec,
+               "estimator": args.estimator, "hr_workers": args.hr_workers,
+               "hr_executor": args.hr_executor, "skip_artifacts": not args.keep_artifacts,
+               "sync_tolerance_ms": args.sync_tolerance_ms,
+               "breathing": not args.no_breathing,
+               "plots": args.plots, "plot_dpi": args.plot_dpi,
+               "incremental": not args.force, "cprofile": args.cprofile}
+    summary, cohort, stages = run_batch(jobs, workers=args.workers, options=options)
+
+    summary_csv = RESULTS_ROOT / "cohort_summary.csv"
+    summary.to_csv(summary_csv, index=False)
+    n_failed = int((~summary["Status"].isin(NUMERIC_OK)).sum())
+    n_plot_failed = int((summary["Status"] == "plot_failed").sum())
+    print(f"\nSaved cohort summary to: {summary_csv} ({n_failed} failed, "
+          f"{n_plot_failed} with failed plots)")
+    print(f"Input cache: {int(summary['CacheHits'].sum())} hits, "
+          f"{int(summary['CacheMisses'].sum())} misses")
+    print(f"Stages: {int(summary['StagesRun'].sum())} run, "
+          f"{int(summary['StagesReused'].sum())} reused")
+    ok = summary[summary["Status"].isin(NUMERIC_OK)]
+    if len(ok):
+        print(ok[["MAE", "RMSE", "MAPE"]].mean().round(2).to_string())
+
+    stages_csv = RESULTS_ROOT / "cohort_stages.csv"
+    stages.to_csv(stages_csv)
+    print(f"\nSaved stage timings to: {stages_csv}")
+    print(stages[["runs", "wall_s_total", "cpu_s_total", "peak_rss_mb_max"]].round(3).to_string())
+
+    cohort_csv = RESULTS_ROOT / "cohort_metrics.csv"
+    cohort.to_csv(cohort_csv)
+    print(f"\nSaved cohort metrics to: {cohort_csv}")
+    print(cohort.loc[["pooled"]].round(2).to_string())
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,159 @@
+"""
+Content-addressed stage manifests for incremental re-processing.
+
+Every pipeline stage gets a key: the SHA-1 of its name, its parameters, the
+keys (or input file digests) it depends on and the source code of the modules
+that implement it. The stage result is pickled under
+$BCG_CACHE_DIR/stages/<out_dir hash>/<name>-<key>.pkl (<out_dir>/.stages/
+when the cache is disabled), so the large intermediate results stay out of
+the results folder, and recorded, with the files the stage writes, in
+<out_dir>/manifest.json. On the next run a stage whose key matches
+and whose output files still exist is not run again: its result is loaded
+from disk, and only when a later stage actually needs it.
+
+Changing a parameter, an input CSV or the code of a stage therefore re-runs
+that stage and everything downstream of it, and nothing else.
+"""
+
+import hashlib
+import importlib.util
+import json
+import os
+import pickle
+import sys
+import uuid
+from pathlib import Path
+import input_cache
+
+_code_digests = {}
+
+
+def _write_atomic(path: Path, data: bytes):
+    tmp = path.with_name(f".tmp-{uuid.uuid4().hex}")
+    tmp.write_bytes(data)
+    os.replace(tmp, path)
+
+
+def file_digest(path) -> str:
+    """SHA-1 of the file contents.
+
+    The digest is remembered next to the input cache, keyed by path, mtime and
+    size, so an unchanged multi-GB CSV is only read once."""
+    path = Path(path)
+    st = path.stat()
+    root = input_cache.cache_dir()
+    memo = None
+    if root is not None:
+        key = f"{path.resolve()}|{st.st_mtime_ns}|{st.st_size}"
+        memo = root / "digests" / hashlib.sha1(key.encode("utf-8")).hexdigest()
+        if memo.is_file():
+            return memo.read_text(encoding="utf-8")
+
+    h = hashlib.sha1()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    digest = h.hexdigest()
+    if memo is not None:
+        memo.parent.mkdir(parents=True, exist_ok=True)
+        _write_atomic(memo, digest.encode("utf-8"))
+    return digest
+
+
+def code_digest(*modules) -> str:
+    """SHA-1 of the source files of the given modules (or module names);
+    modules that are imported lazily are located without importing them."""
+    h = hashlib.sha1()
+    for module in modules:
+        name = module if isinstance(module, str) else module.__name__
+        if name not in _code_digests:
+            module = sys.modules.get(name)
+            source = Path(module.__file__ if module else importlib.util.find_spec(name).origin)
+            _code_digests[name] = hashlib.sha1(source.read_bytes()).hexdigest()
+        h.update(_code_digests[name].encode("ascii"))
+    return h.hexdigest()
+
+
+def stage_key(name: str, params: dict, deps=(), code=()) -> str:
+    """Key of a stage: hash of its name, parameters, upstream keys and code."""
+    payload = json.dumps({"stage": name, "params": params, "deps": list(deps),
+                          "code": code_digest(*code) if code else ""},
+                         sort_keys=True, default=str)
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()[:16]
+
+
+def stage_dir(out_dir: Path) -> Path:
+    """Directory of the pickled stage results of the pair in out_dir."""
+    root = input_cache.cache_dir()
+    if root is None:
+        return Path(out_dir) / ".stages"
+    tag = hashlib.sha1(str(Path(out_dir).resolve()).encode("utf-8")).hexdigest()[:16]
+    return root / "stages" / tag
+
+
+class StageStore:
+    """Per-pair store of stage results and their manifest.
+
+    With enabled=False every stage runs (and its result is still recorded, so
+    the next incremental run can reuse it)."""
+
+    def __init__(self, out_dir: Path, enabled: bool = True):
+        self.out_dir = Path(out_dir)
+        self.root = stage_dir(self.out_dir)
+        self.manifest_path = self.out_dir / "manifest.json"
+        self.enabled = enabled
+        self.reused = []
+        self.ran = []
+        try:
+            self.manifest = json.loads(self.manifest_path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            self.manifest = {}
+
+    def _result_path(self, name: str, key: str) -> Path:
+        return self.root / f"{name}-{key}.pkl"
+
+    def is_current(self, name: str, key: str) -> bool:
+        """Whether the stage ran with this key and its outputs still exist."""
+        entry = self.manifest.get(name)
+        return (self.enabled and entry is not None and entry["key"] == key
+                and self._result_path(name, key).is_file()
+                and all((self.out_dir / p).exists() for p in entry["outputs"]))
+
+    def _record(self, name: str, key: str, value, params: dict, outputs):
+        self.root.mkdir(parents=True, exist_ok=True)
+        for old in self.root.glob(f"{name}-*.pkl"):
+            if old.name != self._result_path(name, key).name:
+                old.unlink()
+        _write_atomic(self._result_path(name, key),
+                      pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL))
+        self.manifest[name] = {"key": key, "params": params,
+                               "outputs": [str(Path(p).relative_to(self.out_dir)) for p in outputs]}
+        _write_atomic(self.manifest_path,
+                      json.dumps(self.manifest, indent=2, sort_keys=True, default=str).encode("utf-8"))
+
+    def lazy(self, name: str, key: str, compute, params: dict = None, outputs=()):
+        """A zero-argument callable returning the stage result.
+
+        The result is loaded from a previous run when the key matches,
+        otherwise compute() runs and its result is recorded. Either happens
+        at most once, on the first call."""
+        result = []
+
+        def get():
+            if not result:
+                if self.is_current(name, key):
+                    print(f"↺ Reusing stage {name} ({key})")
+                    self.reused.append(name)
+                    with open(self._result_path(name, key), "rb") as f:
+                        result.append(pickle.load(f))
+                else:
+                    value = compute()
+                    self.ran.append(name)
+                    self._record(name, key, value, params or {}, outputs)
+                    result.append(value)
+            return result[0]
+        return get
+
+    def run(self, name: str, key: str, compute, params: dict = None, outputs=()):
+        """Run (or reuse) the stage now and return its result."""
+        return self.lazy(name, key, compute, params, outputs)()
@@ -0,0 +1,105 @@
+"""
+Intra-recording parallelism for the heart-rate stage.
+
+The resampled signal is cut into segments that start on window boundaries.
+Each segment is filtered together with `pad` extra samples on both sides,
+where pad is the length after which the filter's transient has decayed below
+1e-12 (from the largest pole radius of its second-order sections), and its
+windows are then estimated independently. The per-segment rates are
+concatenated in order; because every estimator that runs here only looks at
+the samples of its own window, the result equals the serial path up to the
+last bits of the filtered values.
+
+Windows that overlap (hop_sec) are not independent, so in that mode only the
+filtering is split and the rates are estimated serially afterwards.
+"""
+
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from functools import lru_cache
+import numpy as np
+from band_pass_filtering import band_pass_filtering, design_sos
+from compute_vitals import estimate_rates
+from artifacts import masked_rates
+
+# target length of one segment, in seconds of signal
+SEGMENT_SEC = 30 * 60
+
+
+@lru_cache(maxsize=None)
+def filter_transient(fs: float, filter_type: str, tol: float = 1e-12) -> int:
+    """Samples after which the impulse response of the filter is below tol."""
+    from scipy.signal import sos2zpk
+    _, poles, _ = sos2zpk(design_sos(fs, filter_type))
+    radius = np.abs(poles).max()
+    if radius == 0:
+        return 0
+    # twice the pole-radius bound, for the gain of repeated/complex poles
+    return int(2 * np.ceil(np.log(tol) / np.log(radius)))
+
+
+def segment_bounds(n: int, win_size: int, segment_sec: float, fs: float) -> list:
+    """[(start, stop), ...] covering 0..n, starting on multiples of win_size."""
+    step = max(1, int(segment_sec * fs) // win_size) * win_size
+    starts = list(range(0, n, step)) or [0]
+    return [(a, min(a + step, n)) for a in starts]
+
+
+def _filter_segment(padded: np.ndarray, offset: int, length: int, fs: float, filter_type: str):
+    return band_pass_filtering(padded, fs, filter_type=filter_type)[offset:offset + length]
+
+
+def _segment_rates(padded: np.ndarray, offset: int, length: int, fs: float, filter_type: str,
+                   win_size: int, estimator: str, artifacts: np.ndarray = None):
+    filtered = _filter_segment(padded, offset, length, fs, filter_type)
+    if artifacts is not None:
+        return masked_rates(lambda sig: estimate_rates(sig, fs, win_size, method=estimator),
+                            filtered, win_size, artifacts)
+    return estimate_rates(filtered, fs, win_size, method=estimator)
+
+
+def _executor(kind: str, workers: int):
+    if kind == "thread":
+        return ThreadPoolExecutor(max_workers=workers)
+    if kind == "process":
+        return ProcessPoolExecutor(max_workers=workers)
+    raise ValueError(f"Unknown executor: {kind}")
+
+
+def _padded_segments(sig, bounds, pad):
+    for a, b in bounds:
+        lo, hi = max(a - pad, 0), min(b + pad, len(sig))
+        yield np.asarray(sig[lo:hi]), a - lo, b - a
+
+
+def parallel_filter(sig: np.ndarray, fs: float, filter_type: str = "bcg", workers: int = 2,
+                    executor: str = "thread", segment_sec: float = SEGMENT_SEC) -> np.ndarray:
+    """band_pass_filtering of sig, computed segment-wise on a pool."""
+    bounds = segment_bounds(len(sig), 1, segment_sec, fs)
+    pad = filter_transient(float(fs), filter_type)
+    with _executor(executor, workers) as pool:
+        parts = pool.map(_filter_segment,
+                         *zip(*[(seg, off, length, fs, filter_type)
+                                for seg, off, length in _padded_segments(sig, bounds, pad)]))
+        return np.concatenate(list(parts))
+
+
+def parallel_bpm_array(sig: np.ndarray, fs: float, win_sec: int = 10, workers: int = 2,
+                       executor: str = "thread", estimator: str = "peaks",
+                       filter_type: str = "bcg", segment_sec: float = SEGMENT_SEC,
+                       artifacts: np.ndarray = None) -> np.ndarray:
+    """Filter the raw (resampled) signal and estimate one rate per
+    non-overlapping window, segment-wise on a pool of threads or processes.
+
+    Equals calculate_bpm_array(compute_filtered_signal(sig, fs), fs, win_sec,
+    estimator=estimator, artifacts=artifacts)."""
+    win_size = int(win_sec * fs)
+    n_windows = len(sig) // win_size
+    bounds = segment_bounds(n_windows * win_size, win_size, segment_sec, fs)
+    pad = filter_transient(float(fs), filter_type)
+    # segments only cover whole windows, but are padded from the full signal
+    tasks = [(seg, off, length, fs, filter_type, win_size, estimator,
+              None if artifacts is None else artifacts[a // win_size:b // win_size])
+             for (seg, off, length), (a, b) in zip(_padded_segments(sig, bounds, pad), bounds)]
+    with _executor(executor, workers) as pool:
+        parts = list(pool.map(_segment_rates, *zip(*tasks)))
+    return np.concatenate(parts)[:n_windows] if parts else np.zeros(0)
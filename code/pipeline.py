@@ -0,0 +1,279 @@
+"""
+In-memory BCG heart-rate pipeline.
+
+The stages hand compact records (records.py: float32 signal, int32 time
+offsets) directly to each other instead of writing a CSV and reading it back
+between every step. The intermediate files of the original file-based chain
+(_bcg_timestamp.csv, _bcg_hr.csv and _bcg_hr_ts_fmt.csv) are only written
+when debug_dump is set.
+
+Each stage is keyed on its inputs, parameters and code; unchanged stages
+are reused from the previous run instead of recomputed (manifest.py).
+"""
+
+from pathlib import Path
+import numpy as np
+import generate_timestamp_and_resampling as gtr
+import BCG_heartrate as BCG_hr
+import change_timestamp as ct
+import synchronization as sync
+import Mean_error as er
+import plotting as pl
+import rendering
+import respiration as resp
+import artifacts
+import manifest
+import parallel
+import profiling
+from records import PairMetrics, Recording, WindowRates
+
+
+def resample_stage(bcg_path: Path, fs_new: float = 50.0, chunk_size: int = None,
+                   method: str = 'interp') -> Recording:
+    """Load the raw BCG recording, rebuild its timestamps and resample it.
+
+    With chunk_size the raw file is streamed in blocks of that many rows,
+    keeping peak memory independent of the recording length. method selects
+    the resampler ('interp', 'poly' or 'auto', see resampling.py)."""
+    if chunk_size:
+        # loading and resampling are interleaved block by block
+        with profiling.stage("resample") as rec:
+            recording = gtr.resample_file_recording(str(bcg_path), fs_new=fs_new,
+                                                    chunk_size=chunk_size, method=method)
+            rec["samples"] = len(recording)
+        return recording
+    with profiling.stage("load") as rec:
+        raw = gtr.load_recording(str(bcg_path))
+        rec["samples"] = len(raw)
+    with profiling.stage("resample", samples=len(raw)):
+        return gtr.resample_recording(raw, fs_new=fs_new, method=method)
+
+
+def heart_rate_stage(resampled: Recording, fs: float = 50.0, win_sec: int = 10,
+                     hop_sec: float = None, estimator: str = 'peaks', workers: int = 1,
+                     executor: str = 'thread', skip_artifacts: bool = True) -> WindowRates:
+    """Filter the resampled BCG and estimate one heart rate per window
+    (one window every hop_sec seconds when given) with the given engine.
+
+    With skip_artifacts, motion/clipping windows (artifacts.py) are flagged
+    in an Artifact column and their heart rate is NaN. With workers > 1 the
+    recording is split into padded segments that are filtered (and, for
+    non-overlapping windows, estimated) on a pool of threads or processes,
+    see parallel.py."""
+    sig = resampled.bcg
+    win_size = int(win_sec * fs)
+    hop = max(1, int(hop_sec * fs)) if hop_sec else None
+    mask = None
+    if skip_artifacts:
+        with profiling.stage("artifacts", samples=len(sig)):
+            mask = artifacts.detect_artifacts(sig, win_size, hop)
+    if workers > 1 and not hop_sec:
+        with profiling.stage("filter+vitals", samples=len(sig)):
+            bpm = parallel.parallel_bpm_array(sig, fs, win_sec=win_sec, workers=workers,
+                                              executor=executor, estimator=estimator,
+                                              artifacts=mask)
+        return resampled.windows(bpm, win_size, 'Heart Rate', artifacts=mask)
+    with profiling.stage("filter", samples=len(sig)):
+        if workers > 1:
+            filt = parallel.parallel_filter(sig, fs, workers=workers, executor=executor)
+        else:
+            filt = BCG_hr.compute_filtered_signal(sig, fs=fs)
+    with profiling.stage("vitals", samples=len(filt)):
+        bpm = BCG_hr.calculate_bpm_array(filt, fs=fs, win_sec=win_sec, hop_sec=hop_sec,
+                                         estimator=estimator, artifacts=mask)
+    return resampled.windows(bpm, hop or win_size, 'Heart Rate', artifacts=mask)
+
+
+def breathing_stage(resampled: Recording, fs: float = 50.0, win_sec: int = 30) -> WindowRates:
+    """Estimate one respiration rate per window from the same resampled BCG."""
+    breath, fs_breath = resp.compute_breathing_signal(resampled.bcg, fs)
+    rates = resp.calculate_breath_rate_array(breath, fs_breath, win_sec=win_sec)
+    return resampled.windows(rates, int(win_sec * fs), 'Respiratory Rate')
+
+
+def sync_stage(rates: WindowRates, rr_path: Path, tolerance_ms: int = 0):
+    """Align a per-window BCG rate with the reference RR recording.
+
+    Works on int64 epoch milliseconds throughout. For exact matching
+    (tolerance_ms 0) the BCG window timestamps are truncated to whole seconds,
+    the resolution of the RR clock; with a tolerance they are matched as they
+    are, so that tolerances below a second take effect."""
+    bcg_ms = rates.timestamps
+    if tolerance_ms == 0:
+        bcg_ms = bcg_ms - bcg_ms % 1000
+    with profiling.stage("load") as rec:
+        rr = sync.load_rr_columns(str(rr_path))
+        rec["samples"] = len(rr['Timestamp'])
+    rr_names = [name for name in rr if name != 'Timestamp']
+    with profiling.stage("sync", samples=len(bcg_ms) + len(rr['Timestamp'])):
+        timestamps, bcg_sync, rr_sync = sync.synchronize_arrays(
+            bcg_ms, rates.values[:, None],
+            rr['Timestamp'], np.column_stack([rr[name] for name in rr_names]),
+            tolerance_ms=tolerance_ms
+        )
+        return sync.build_sync_frames(timestamps, [rates.name], bcg_sync, rr_names, rr_sync)
+
+
+# modules whose source code is part of each stage's key
+STAGE_CODE = {
+    "resample": ("generate_timestamp_and_resampling", "resampling", "records"),
+    "heart_rate": ("BCG_heartrate", "band_pass_filtering", "compute_vitals", "detect_peaks",
+                   "beat_to_beat", "spectral", "parallel", "artifacts", "records"),
+    "sync": ("synchronization", "change_timestamp", "records"),
+    "breathing": ("respiration", "detrending", "remove_nonLinear_trend", "band_pass_filtering",
+                  "compute_vitals", "detect_peaks", "resampling", "synchronization",
+                  "change_timestamp", "records"),
+    "plot": ("plotting", "rendering", "BCG_heartrate"),
+}
+
+
+def run_pipeline(bcg_path: Path, rr_path: Path, out_dir: Path, prefix: str,
+                 cprofile: bool = False, **options) -> PairMetrics:
+    """Run every stage for one BCG/RR pair and return its metrics.
+
+    Besides the scalar metrics the record holds the synchronized reference and
+    estimated heart rates as HR_ref / HR_est, and the per-stage timing
+    records (profiling.py) as Stages; these are also written to
+    <prefix>_stages.json/.csv. With cprofile the slowest stage is profiled
+    and dumped to <prefix>_hottest_<stage>.prof. options are those of
+    _run_stages."""
+    profiler = profiling.StageProfiler(cprofile=cprofile)
+    with profiling.activate(profiler):
+        metrics = _run_stages(bcg_path, rr_path, out_dir, prefix, **options)
+    profiler.write(out_dir, prefix)
+    metrics.Stages = profiler.records
+    return metrics
+
+
+def _run_stages(bcg_path: Path, rr_path: Path, out_dir: Path, prefix: str,
+                fs_new: float = 50.0, win_sec: int = 10, hop_sec: float = None,
+                estimator: str = 'peaks', hr_workers: int = 1, hr_executor: str = 'thread',
+                skip_artifacts: bool = True,
+                debug_dump: bool = False, chunk_size: int = None, resample_method: str = 'interp',
+                sync_tolerance_ms: int = 0, breathing: bool = True,
+                plots: str = 'full', plot_dpi: int = rendering.DEFAULT_DPI,
+                incremental: bool = True) -> PairMetrics:
+    """The stages of run_pipeline.
+
+    plots is 'full', 'off' or 'deferred'; deferred plot jobs are returned as
+    PlotJobs for rendering.render_deferred, the errors of plots that failed
+    in 'full' mode as PlotErrors (the numeric results are kept). With incremental, stages whose
+    inputs, parameters and code are unchanged since the previous run are
+    reused from out_dir (see manifest.py)."""
+    store = manifest.StageStore(out_dir, enabled=incremental)
+    bcg_digest = manifest.file_digest(bcg_path)
+    rr_digest = manifest.file_digest(rr_path)
+    plot_jobs = []
+    plot_errors = []
+
+    # 1) Timestamp generation & resampling
+    params = {"fs_new": fs_new, "method": resample_method, "debug_dump": debug_dump}
+    k_res = manifest.stage_key("resample", params, [bcg_digest], STAGE_CODE["resample"])
+    resampled_csv = out_dir / f"{prefix}_bcg_timestamp.csv"
+
+    def run_resample():
+        df = resample_stage(bcg_path, fs_new=fs_new, chunk_size=chunk_size, method=resample_method)
+        if debug_dump:
+            with profiling.stage("timestamp_conversion", samples=len(df)):
+                gtr.save_dataframe(df.to_frame(), str(resampled_csv))
+        return df
+    resampled = store.lazy("resample", k_res, run_resample, params,
+                           [resampled_csv] if debug_dump else [])
+
+    # 2) BCG → Heart rate (BPM)
+    hr_csv = out_dir / f"{prefix}_bcg_hr.csv"
+    hr_fmt_csv = out_dir / f"{prefix}_bcg_hr_ts_fmt.csv"
+    params = {"fs": fs_new, "win_sec": win_sec, "hop_sec": hop_sec, "estimator": estimator,
+              "skip_artifacts": skip_artifacts, "debug_dump": debug_dump}
+    k_hr = manifest.stage_key("heart_rate", params, [k_res], STAGE_CODE["heart_rate"])
+
+    def run_heart_rate():
+        rates = heart_rate_stage(resampled(), fs=fs_new, win_sec=win_sec, hop_sec=hop_sec,
+                                 estimator=estimator, workers=hr_workers, executor=hr_executor,
+                                 skip_artifacts=skip_artifacts)
+        if debug_dump:
+            with profiling.stage("timestamp_conversion", samples=len(rates)):
+                df = rates.to_frame()
+                BCG_hr.save_bpm_to_csv(df, str(hr_csv))
+                ct.export_with_formatted_timestamps(df, hr_fmt_csv, timestamp_col='Timestamp')
+        return rates
+    bpm = store.lazy("heart_rate", k_hr, run_heart_rate, params,
+                        [hr_csv, hr_fmt_csv] if debug_dump else [])
+
+    if plots != 'off':
+        hr_png = out_dir / f"{prefix}_bcg_hr.png"
+        params = {"dpi": plot_dpi}
+        def run_plot_hr():
+            rates = bpm()
+            with profiling.stage("plot", samples=len(rates)):
+                plot_errors.append(rendering.submit(plots, plot_jobs, BCG_hr.plot_bpm_over_time,
+                                                    rates.to_frame(), str(hr_csv), dpi=plot_dpi))
+        store.run("plot_hr", manifest.stage_key("plot_hr", params, [k_hr], STAGE_CODE["plot"]),
+                  run_plot_hr, params, [hr_png])
+
+    # 3) Synchronize with RR
+    sync_bcg = out_dir / f"{prefix}_hr_sync.csv"
+    sync_rr = out_dir / f"{prefix}_rr_sync.csv"
+    params = {"tolerance_ms": sync_tolerance_ms}
+    k_sync = manifest.stage_key("sync", params, [k_hr, rr_digest], STAGE_CODE["sync"])
+
+    def run_sync():
+        bcg_sync, rr_sync, merged = sync_stage(bpm(), rr_path, tolerance_ms=sync_tolerance_ms)
+        with profiling.stage("timestamp_conversion", samples=len(merged)):
+            sync.save_synchronized(bcg_sync, rr_sync, merged, str(sync_bcg), str(sync_rr))
+        return bcg_sync, rr_sync
+    bcg_sync, rr_sync = store.run("sync", k_sync, run_sync, params,
+                                  [sync_bcg, sync_rr, f"{sync_bcg}___Merged.csv"])
+
+    # 4) Error metrics on the synchronized heart rates, artifact windows left out
+    hr_ref = rr_sync['Heart Rate'].values
+    hr_est = bcg_sync['Heart Rate'].values
+    clean = ~np.isnan(hr_est)
+    with profiling.stage("metrics", samples=len(rr_sync)):
+        metrics = PairMetrics(**er.compute_heart_rate_metrics(hr_ref[clean], hr_est[clean]))
+    n_artifacts = int((~clean).sum())
+    print(f"Artifact windows: {n_artifacts} of {len(clean)}")
+    metrics.Artifacts = n_artifacts / len(clean) if len(clean) else 0.0
+    # aligned series for the cohort-level statistics (Mean_error.cohort_metrics)
+    metrics.HR_ref = hr_ref[clean]
+    metrics.HR_est = hr_est[clean]
+
+    # 5) Respiration rate from the same resampled signal
+    if breathing:
+        breath_csv = out_dir / f"{prefix}_breath_sync.csv"
+        params = {"fs": fs_new, "tolerance_ms": sync_tolerance_ms}
+        k_breath = manifest.stage_key("breathing", params, [k_res, rr_digest],
+                                      STAGE_CODE["breathing"])
+
+        def run_breathing():
+            recording = resampled()
+            with profiling.stage("breathing", samples=len(recording)):
+                breath = breathing_stage(recording, fs=fs_new)
+            breath_sync, rr_sync, _ = sync_stage(breath, rr_path, tolerance_ms=sync_tolerance_ms)
+            breath_sync = sync.join_sync_frames(breath_sync, rr_sync)
+            with profiling.stage("timestamp_conversion", samples=len(breath_sync)):
+                ct.export_with_formatted_timestamps(breath_sync, breath_csv,
+                                                    time_format=sync.EXPORT_TIME_FORMAT, index=True)
+            return breath_sync
+        breath_sync = store.run("breathing", k_breath, run_breathing, params, [breath_csv])
+        metrics.update(resp.summarize_breathing(breath_sync['Respiratory Rate'].values))
+
+    # 6) Final analysis plot
+    if plots != 'off':
+        analysis_png = out_dir / f"{prefix}_analysis.png"
+        params = {"dpi": plot_dpi}
+        def run_plot_analysis():
+            with profiling.stage("plot", samples=len(metrics.HR_ref)):
+                plot_errors.append(rendering.submit(plots, plot_jobs, pl.plot_hr_arrays,
+                                                    metrics.HR_ref, metrics.HR_est,
+                                                    save_path=str(analysis_png), dpi=plot_dpi))
+        store.run("plot_analysis",
+                  manifest.stage_key("plot_analysis", params, [k_sync], STAGE_CODE["plot"]),
+                  run_plot_analysis, params, [analysis_png])
+    if plot_jobs:
+        metrics.PlotJobs = plot_jobs
+    if any(plot_errors):
+        metrics.PlotErrors = [error for error in plot_errors if error]
+    metrics.StagesRun = len(store.ran)
+    metrics.StagesReused = len(store.reused)
+    return metrics
@@ -1,10 +1,10 @@
 import numpy as np
 import pandas as pd
-import matplotlib.pyplot as plt
-import seaborn as sns
-from scipy import stats
+import rendering
 
-def plot_hr_analysis(reference_csv_path, estimated_csv_path, save_path, column_name='Heart Rate'):
+
+def plot_hr_analysis(reference_csv_path, estimated_csv_path, save_path, column_name='Heart Rate',
+                     dpi=rendering.DEFAULT_DPI):
     """
     Perform Bland–Altman analysis and visual comparison of heart rate estimates.
 
@@ -12,6 +12,7 @@ def plot_hr_analysis(reference_csv_path, estimated_csv_path, save_path, column_n
     - reference_csv_path (str): Path to the reference HR CSV file.
     - estimated_csv_path (str): Path to the estimated HR CSV file.
     - column_name (str): Name of the HR column in both files (default: 'Heart Rate').
+    - dpi (int): Resolution of the saved PNG.
     """
     # Load data (handle empty files gracefully)
     try:
@@ -23,76 +24,99 @@ def plot_hr_analysis(reference_csv_path, estimated_csv_path, save_path, column_n
     except Exception:
         est_df = pd.DataFrame()
 
-    # If either file is empty or missing the column, plot empty graphs
-    if ref_df.empty or est_df.empty or column_name not in ref_df.columns or column_name not in est_df.columns:
-        plt.figure(figsize=(16, 4))
-        for i, title in enumerate(['Bland–Altman Plot', 'Pearson Correlation', 'HR Distribution Comparison'], 1):
-            plt.subplot(1, 3, i)
-            plt.title(title)
-            plt.text(0.5, 0.5, 'No Data', ha='center', va='center', fontsize=16, color='red')
-            plt.xticks([])
-            plt.yticks([])
-        plt.tight_layout()
-        plt.savefig(save_path, dpi=300)
-        return
-    # Load data
-    ref_df = pd.read_csv(reference_csv_path)
-    est_df = pd.read_csv(estimated_csv_path)
+    ref_hr = ref_df[column_name].values if column_name in ref_df.columns else np.empty(0)
+    est_hr = est_df[column_name].values if column_name in est_df.columns else np.empty(0)
+    plot_hr_arrays(ref_hr, est_hr, save_path, dpi=dpi)
+
+
+def _plot_no_data(fig):
+    for i, title in enumerate(['Bland–Altman Plot', 'Pearson Correlation', 'HR Distribution Comparison'], 1):
+        ax = fig.add_subplot(1, 3, i)
+        ax.set_title(title)
+        ax.text(0.5, 0.5, 'No Data', ha='center', va='center', fontsize=16, color='red')
+        ax.set_xticks([])
+        ax.set_yticks([])
+
+
+def plot_hr_arrays(ref_hr, est_hr, save_path, dpi=rendering.DEFAULT_DPI):
+    """
+    Bland–Altman, correlation and distribution plots of aligned HR arrays.
+
+    Same figure as plot_hr_analysis, without reading any CSV. The regression
+    band is the analytic 95 % confidence interval of the fitted line.
 
-    # Extract HR columns
-    ref_hr = ref_df[column_name].values
-    est_hr = est_df[column_name].values
+    Parameters:
+    - ref_hr (np.ndarray): Reference heart rates.
+    - est_hr (np.ndarray): Estimated heart rates, aligned with ref_hr.
+    - save_path (str): Output PNG path.
+    - dpi (int): Resolution of the saved PNG.
+    """
+    from scipy import stats
+    ref_hr = np.asarray(ref_hr, dtype=np.float64)
+    est_hr = np.asarray(est_hr, dtype=np.float64)
+    fig = rendering.get_figure("hr_analysis", (16, 4))
+
+    # If either series is empty, plot empty graphs
+    if ref_hr.size < 2 or est_hr.size < 2:
+        _plot_no_data(fig)
+        fig.tight_layout()
+        fig.savefig(save_path, dpi=dpi)
+        return
 
     # Length check
     if len(ref_hr) != len(est_hr):
         raise ValueError("Length mismatch: reference and estimated HR arrays are not equal.")
 
-    # Build combined DataFrame
-    df = pd.DataFrame({
-        'Reference_HR': ref_hr,
-        'Estimated_HR': est_hr
-    })
-
     # Bland–Altman statistics
-    mean_hr = df.mean(axis=1)
-    diff_hr = df['Estimated_HR'] - df['Reference_HR']
+    mean_hr = (ref_hr + est_hr) / 2
+    diff_hr = est_hr - ref_hr
     bias = np.mean(diff_hr)
     sd_diff = np.std(diff_hr, ddof=1)
     loa_upper = bias + 1.96 * sd_diff
     loa_lower = bias - 1.96 * sd_diff
 
-    # Plotting
-    plt.figure(figsize=(16, 4))
-
     # 1. Bland–Altman plot
-    plt.subplot(1, 3, 1)
-    plt.scatter(mean_hr, diff_hr, alpha=0.6)
-    plt.axhline(bias, color='gray', linestyle='--', label=f'Bias={bias:.2f}')
-    plt.axhline(loa_upper, color='gray', linestyle=':', label=f'+1.96 SD={loa_upper:.2f}')
-    plt.axhline(loa_lower, color='gray', linestyle=':', label=f'-1.96 SD={loa_lower:.2f}')
-    plt.title('Bland–Altman Plot')
-    plt.xlabel('Mean HR (bpm)')
-    plt.ylabel('Difference (Est – Ref)')
-    plt.legend()
-
-    # 2. Pearson correlation
-    plt.subplot(1, 3, 2)
-    sns.regplot(x='Reference_HR', y='Estimated_HR', data=df, ci=95, scatter_kws={'alpha': 0.6})
-    r, p = stats.pearsonr(df['Reference_HR'], df['Estimated_HR'])
-    plt.title(f'Pearson r = {r:.2f}, p = {p:.3f}')
-    plt.xlabel('Reference HR (bpm)')
-    plt.ylabel('Estimated HR (bpm)')
+    ax = fig.add_subplot(1, 3, 1)
+    ax.scatter(mean_hr, diff_hr, alpha=0.6)
+    ax.axhline(bias, color='gray', linestyle='--', label=f'Bias={bias:.2f}')
+    ax.axhline(loa_upper, color='gray', linestyle=':', label=f'+1.96 SD={loa_upper:.2f}')
+    ax.axhline(loa_lower, color='gray', linestyle=':', label=f'-1.96 SD={loa_lower:.2f}')
+    ax.set_title('Bland–Altman Plot')
+    ax.set_xlabel('Mean HR (bpm)')
+    ax.set_ylabel('Difference (Est – Ref)')
+    ax.legend()
+
+    # 2. Pearson correlation with the regression line and its 95 % band
+    ax = fig.add_subplot(1, 3, 2)
+    ax.scatter(ref_hr, est_hr, alpha=0.6)
+    r, p = stats.pearsonr(ref_hr, est_hr)
+    n = ref_hr.size
+    if n > 2 and np.ptp(ref_hr) > 0:
+        slope, intercept = np.polyfit(ref_hr, est_hr, 1)
+        grid = np.linspace(ref_hr.min(), ref_hr.max(), 100)
+        fit = slope * grid + intercept
+        resid = est_hr - (slope * ref_hr + intercept)
+        s_err = np.sqrt(np.sum(resid ** 2) / (n - 2))
+        x_mean = ref_hr.mean()
+        half = stats.t.ppf(0.975, n - 2) * s_err * np.sqrt(
+            1 / n + (grid - x_mean) ** 2 / np.sum((ref_hr - x_mean) ** 2))
+        ax.plot(grid, fit, color='C0')
+        ax.fill_between(grid, fit - half, fit + half, color='C0', alpha=0.15)
+    ax.set_title(f'Pearson r = {r:.2f}, p = {p:.3f}')
+    ax.set_xlabel('Reference HR (bpm)')
+    ax.set_ylabel('Estimated HR (bpm)')
 
     # 3. Boxplot comparison
-    plt.subplot(1, 3, 3)
-    df_melt = df.melt(var_name='Type', value_name='HR')
-    sns.boxplot(x='Type', y='HR', data=df_melt)
-    plt.title('HR Distribution Comparison')
-    plt.ylabel('Heart Rate (bpm)')
-    plt.xlabel('')
-
-    plt.tight_layout()
-    plt.savefig(save_path, dpi=300)
+    ax = fig.add_subplot(1, 3, 3)
+    box = ax.boxplot([ref_hr, est_hr], tick_labels=['Reference_HR', 'Estimated_HR'],
+                     patch_artist=True, widths=0.8, medianprops={'color': '0.25'})
+    for patch, color in zip(box['boxes'], ['C0', 'C1']):
+        patch.set_facecolor(color)
+    ax.set_title('HR Distribution Comparison')
+    ax.set_ylabel('Heart Rate (bpm)')
+
+    fig.tight_layout()
+    fig.savefig(save_path, dpi=dpi)
 
 # # Example usage:
 # plot_hr_analysis(
@@ -0,0 +1,150 @@
+"""
+Per-stage instrumentation of the pipeline.
+
+Code marks its stages with
+
+    with profiling.stage("filter", samples=len(sig)):
+        ...
+
+which, while a StageProfiler is active in the process, records the wall
+time, CPU time, peak resident memory and number of samples processed by the
+stage; without an active profiler it does nothing. Stages should not nest.
+
+Peak RSS is per stage where Linux allows resetting the high-water mark
+(/proc/self/clear_refs), otherwise it is the process peak so far. With
+cprofile=True every stage also runs under cProfile and the statistics of the
+slowest one are kept for dumping.
+"""
+
+import contextlib
+import cProfile
+import csv
+import json
+import time
+from pathlib import Path
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+FIELDS = ["stage", "wall_s", "cpu_s", "peak_rss_mb", "samples"]
+
+_active = None
+
+
+def _reset_peak_rss():
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+    except OSError:
+        pass
+
+
+def _peak_rss_mb():
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    if resource is None:
+        return None
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+class StageProfiler:
+    """Collects one record per stage run while it is active."""
+
+    def __init__(self, cprofile: bool = False):
+        self.cprofile = cprofile
+        self.records = []
+        self.hottest = None  # (wall_s, stage, cProfile.Profile)
+
+    @contextlib.contextmanager
+    def stage(self, name: str, samples: int = None):
+        record = {"stage": name, "samples": samples}
+        profiler = cProfile.Profile() if self.cprofile else None
+        _reset_peak_rss()
+        wall, cpu = time.perf_counter(), time.process_time()
+        if profiler is not None:
+            profiler.enable()
+        try:
+            yield record
+        finally:
+            if profiler is not None:
+                profiler.disable()
+            record["wall_s"] = time.perf_counter() - wall
+            record["cpu_s"] = time.process_time() - cpu
+            record["peak_rss_mb"] = _peak_rss_mb()
+            self.records.append(record)
+            if profiler is not None and (self.hottest is None or record["wall_s"] > self.hottest[0]):
+                self.hottest = (record["wall_s"], name, profiler)
+
+    def write(self, out_dir: Path, prefix: str) -> list:
+        """Write <prefix>_stages.json/.csv (and <prefix>_hottest_<stage>.prof
+        with cprofile); returns the paths written."""
+        out_dir = Path(out_dir)
+        json_path = out_dir / f"{prefix}_stages.json"
+        csv_path = out_dir / f"{prefix}_stages.csv"
+        with open(json_path, "w", encoding="utf-8") as f:
+            json.dump(self.records, f, indent=2)
+        with open(csv_path, "w", newline="", encoding="utf-8") as f:
+            writer = csv.DictWriter(f, fieldnames=FIELDS)
+            writer.writeheader()
+            writer.writerows(self.records)
+        paths = [json_path, csv_path]
+        if self.hottest is not None:
+            _, name, profiler = self.hottest
+            prof_path = out_dir / f"{prefix}_hottest_{name}.prof"
+            profiler.dump_stats(str(prof_path))
+            print(f"Saved cProfile of the slowest stage ({name}) to: {prof_path}")
+            paths.append(prof_path)
+        return paths
+
+
+@contextlib.contextmanager
+def activate(profiler: StageProfiler):
+    """Route profiling.stage() calls of this process to `profiler`."""
+    global _active
+    previous, _active = _active, profiler
+    try:
+        yield profiler
+    finally:
+        _active = previous
+
+
+@contextlib.contextmanager
+def stage(name: str, samples: int = None):
+    """Record a stage on the active profiler; a no-op without one."""
+    if _active is None:
+        yield {"stage": name, "samples": samples}
+    else:
+        with _active.stage(name, samples) as record:
+            yield record
+
+
+def rollup(records):
+    """Cohort roll-up of stage records (dicts with a stage field plus FIELDS).
+
+    Returns one row per stage: number of runs, total/mean/max wall time,
+    total CPU time, max peak RSS, total samples and samples per second."""
+    import pandas as pd
+    df = pd.DataFrame(list(records), columns=FIELDS)
+    if df.empty:
+        return pd.DataFrame(columns=["runs", "wall_s_total", "wall_s_mean", "wall_s_max",
+                                     "cpu_s_total", "peak_rss_mb_max", "samples_total",
+                                     "samples_per_s"])
+    grouped = df.groupby("stage", sort=False)
+    out = pd.DataFrame({
+        "runs": grouped.size(),
+        "wall_s_total": grouped["wall_s"].sum(),
+        "wall_s_mean": grouped["wall_s"].mean(),
+        "wall_s_max": grouped["wall_s"].max(),
+        "cpu_s_total": grouped["cpu_s"].sum(),
+        "peak_rss_mb_max": grouped["peak_rss_mb"].max(),
+        "samples_total": grouped["samples"].sum(min_count=1),
+    })
+    out["samples_per_s"] = out["samples_total"] / out["wall_s_total"]
+    return out.sort_values("wall_s_total", ascending=False)
@@ -0,0 +1,184 @@
+"""
+Compact typed records handed between the pipeline stages.
+
+dtype policy:
+- signal buffers are float32: the BCG is made of ADC counts, which float32
+  holds exactly up to 2**24, and filters promote to float64 internally where
+  it matters (scipy's sosfiltfilt, detect_peaks). Signals with larger values
+  stay float64, so the conversion is always lossless for whole counts;
+- timestamps are int32 millisecond offsets from an int64 t0, i.e. 4 instead
+  of 8 bytes per sample for recordings shorter than 24 days;
+- per-window results keep float64 rates: they are few and written to CSV.
+
+The records use __slots__ and hold whole arrays, not per-sample objects.
+to_frame() converts them back to the DataFrames of the file-based tools.
+"""
+
+import numpy as np
+import pandas as pd
+
+SIGNAL_DTYPE = np.float32
+OFFSET_DTYPE = np.int32
+
+# largest magnitude up to which SIGNAL_DTYPE holds every whole count
+MAX_EXACT_COUNT = 2 ** 24
+
+
+def signal_dtype(x: np.ndarray):
+    """SIGNAL_DTYPE, or float64 when x has values beyond MAX_EXACT_COUNT,
+    which float32 would round."""
+    if x.dtype == SIGNAL_DTYPE or x.size == 0:
+        return SIGNAL_DTYPE
+    # min/max instead of abs(): no temporary copy of the signal
+    peak = max(-float(x.min()), float(x.max()))
+    return np.float64 if peak > MAX_EXACT_COUNT else SIGNAL_DTYPE
+
+
+def as_signal(x) -> np.ndarray:
+    """x as a signal buffer (float32, see signal_dtype), without copying
+    when it already is one."""
+    x = np.asarray(x)
+    return x.astype(signal_dtype(x), copy=False)
+
+
+def as_counts(x) -> np.ndarray:
+    """x truncated to whole ADC counts, as a signal buffer (float32, see
+    signal_dtype).
+
+    Truncation happens before the cast, like the int64 cast it replaces."""
+    x = np.asarray(x)
+    if x.dtype.kind not in "iu":
+        x = np.trunc(x)
+    return x.astype(signal_dtype(x), copy=False)
+
+
+def offsets_from(timestamps_ms, t0_ms: int) -> np.ndarray:
+    """int32 offsets of int64 epoch-ms timestamps from t0_ms."""
+    offsets = np.asarray(timestamps_ms, dtype=np.int64) - np.int64(t0_ms)
+    limits = np.iinfo(OFFSET_DTYPE)
+    if offsets.size and (offsets.max() > limits.max or offsets.min() < limits.min):
+        raise ValueError("Recording too long for int32 millisecond offsets")
+    return offsets.astype(OFFSET_DTYPE)
+
+
+def split_timestamps(timestamps_ms) -> tuple[int, np.ndarray]:
+    """(t0, int32 offsets) of int64 epoch-ms timestamps."""
+    timestamps_ms = np.asarray(timestamps_ms, dtype=np.int64)
+    t0 = int(timestamps_ms[0]) if timestamps_ms.size else 0
+    return t0, offsets_from(timestamps_ms, t0)
+
+
+class Recording:
+    """A uniformly sampled BCG signal.
+
+    bcg is a float32 buffer (float64 for counts beyond MAX_EXACT_COUNT),
+    offsets_ms the int32 time of every sample relative to t0_ms (int64 epoch
+    milliseconds) and fs the float64 sampling rate, which may be fractional."""
+
+    __slots__ = ("t0_ms", "fs", "offsets_ms", "bcg")
+
+    def __init__(self, t0_ms: int, fs: float, offsets_ms: np.ndarray, bcg: np.ndarray):
+        self.t0_ms = int(t0_ms)
+        self.fs = float(fs)
+        self.offsets_ms = np.asarray(offsets_ms, dtype=OFFSET_DTYPE)
+        self.bcg = as_signal(bcg)
+
+    @classmethod
+    def from_timestamps(cls, timestamps_ms, bcg, fs: float) -> "Recording":
+        t0, offsets = split_timestamps(timestamps_ms)
+        return cls(t0, fs, offsets, bcg)
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame) -> "Recording":
+        """From a BCG / Timestamp / fs DataFrame (load_and_expand_timestamps)."""
+        return cls.from_timestamps(df['Timestamp'].values, as_counts(df['BCG'].values),
+                                   float(df['fs'].iloc[0]) if len(df) else 0.0)
+
+    def __len__(self) -> int:
+        return self.bcg.size
+
+    @property
+    def timestamps(self) -> np.ndarray:
+        """int64 epoch-ms timestamps of the samples."""
+        return self.t0_ms + self.offsets_ms.astype(np.int64)
+
+    def windows(self, values: np.ndarray, step: int, name: str,
+                artifacts: np.ndarray = None) -> "WindowRates":
+        """Per-window values of windows starting every step samples."""
+        n = len(values)
+        return WindowRates(self.t0_ms, self.offsets_ms[::step][:n].copy(), values, name,
+                           None if artifacts is None else artifacts[:n])
+
+    def to_frame(self) -> pd.DataFrame:
+        """BCG (int64 counts) / Timestamp (int64 ms) / fs (float64) DataFrame."""
+        return pd.DataFrame({
+            'BCG': self.bcg.astype(np.int64),
+            'Timestamp': self.timestamps,
+            'fs': np.float64(self.fs)
+        })
+
+
+class WindowRates:
+    """One rate per analysis window (heart or respiration rate).
+
+    values are float64 (NaN for masked windows), artifacts the optional
+    boolean artifact flag of every window, name the rate's column name."""
+
+    __slots__ = ("t0_ms", "offsets_ms", "values", "name", "artifacts")
+
+    def __init__(self, t0_ms: int, offsets_ms: np.ndarray, values: np.ndarray, name: str,
+                 artifacts: np.ndarray = None):
+        self.t0_ms = int(t0_ms)
+        self.offsets_ms = np.asarray(offsets_ms, dtype=OFFSET_DTYPE)
+        self.values = np.asarray(values, dtype=np.float64)
+        self.name = name
+        self.artifacts = artifacts
+
+    @classmethod
+    def from_timestamps(cls, timestamps_ms, values: np.ndarray, step: int, name: str,
+                        artifacts: np.ndarray = None) -> "WindowRates":
+        """Rates of windows starting every step samples of a signal whose
+        samples have the given int64 epoch-ms timestamps."""
+        n = len(values)
+        t0, offsets = split_timestamps(np.asarray(timestamps_ms)[::step][:n])
+        return cls(t0, offsets, values, name, None if artifacts is None else artifacts[:n])
+
+    def __len__(self) -> int:
+        return self.values.size
+
+    @property
+    def timestamps(self) -> np.ndarray:
+        """int64 epoch-ms start time of every window."""
+        return self.t0_ms + self.offsets_ms.astype(np.int64)
+
+    def to_frame(self) -> pd.DataFrame:
+        """Timestamp / <name> [/ Artifact] DataFrame."""
+        df = pd.DataFrame({'Timestamp': self.timestamps, self.name: self.values})
+        if self.artifacts is not None:
+            df['Artifact'] = self.artifacts
+        return df
+
+
+class PairMetrics:
+    """Results of one BCG/RR pair (pipeline.run_pipeline).
+
+    Fields left at None were not computed (e.g. BR_* without the breathing
+    stage) and are omitted by as_dict()."""
+
+    __slots__ = ("MAE", "RMSE", "MAPE", "Artifacts", "BR_min", "BR_max", "BR_mean",
+                 "HR_ref", "HR_est", "StagesRun", "StagesReused", "PlotJobs", "PlotErrors",
+                 "Stages")
+
+    def __init__(self, **values):
+        for field in self.__slots__:
+            setattr(self, field, values.pop(field, None))
+        if values:
+            raise TypeError(f"Unknown metrics: {', '.join(values)}")
+
+    def update(self, values: dict):
+        for field, value in values.items():
+            setattr(self, field, value)
+
+    def as_dict(self) -> dict:
+        return {field: getattr(self, field) for field in self.__slots__
+                if getattr(self, field) is not None}
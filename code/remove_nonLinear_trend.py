@@ -4,11 +4,13 @@ Function to remove nonlinear trend.
 """
 
 import numpy as np
+from detrending import polynomial_trend
 
 
-def remove_nonLinear_trend(input_signal, order):
-    # Detrend with a n order polynomial
-    model = np.polyfit(np.arange(0, input_signal.size), input_signal, order)
-    predicted = np.polyval(model, np.arange(0, input_signal.size))
-    filteredSignal = input_signal - predicted
+def remove_nonLinear_trend(input_signal, order, segment=None):
+    # Detrend with a n order polynomial, fitted on an abscissa scaled to
+    # [-1, 1]; with segment (samples) the fit is piecewise over overlapping
+    # windows of that length (see detrending.polynomial_trend)
+    predicted = polynomial_trend(input_signal, order, segment=segment)
+    filteredSignal = np.asarray(input_signal, dtype=np.float64) - predicted
     return filteredSignal
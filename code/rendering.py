@@ -0,0 +1,112 @@
+"""
+Rendering layer shared by the plotting functions.
+
+- Selects the non-interactive Agg backend when there is no display (headless
+  servers, batch workers), unless a backend was chosen via $MPLBACKEND.
+- Hands out one reusable Figure per plot kind, cleared between uses, so a
+  batch run does not accumulate figures.
+- Plot jobs run immediately ('full'), are skipped ('off') or are queued
+  ('deferred') and rendered by render_deferred() after the numeric pipeline,
+  possibly on a process pool. A failing plot job never raises: its traceback
+  goes to the log and the error is returned to the caller.
+
+matplotlib is only imported by the first plot, so runs without plots never
+pay for it.
+"""
+
+import contextlib
+import os
+import sys
+import traceback
+
+PLOT_MODES = ("full", "deferred", "off")
+DEFAULT_DPI = 300
+
+_figures = {}
+
+
+def _has_display() -> bool:
+    if sys.platform in ("win32", "darwin"):
+        return True
+    return bool(os.environ.get("DISPLAY") or os.environ.get("WAYLAND_DISPLAY"))
+
+
+def pyplot():
+    """matplotlib.pyplot, imported on first use with the backend selected."""
+    if "matplotlib.pyplot" not in sys.modules:
+        import matplotlib
+        if "MPLBACKEND" not in os.environ and not _has_display():
+            matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+    return plt
+
+
+def get_figure(key: str, figsize):
+    """The cleared, reusable figure for plot kind `key`."""
+    plt = pyplot()
+    fig = _figures.get(key)
+    if fig is None or not plt.fignum_exists(fig.number):
+        fig = plt.figure(figsize=figsize)
+        _figures[key] = fig
+    else:
+        fig.clf()
+        fig.set_size_inches(figsize)
+    return fig
+
+
+def close_figures():
+    """Close all reusable figures."""
+    if not _figures:
+        return
+    plt = pyplot()
+    for fig in _figures.values():
+        plt.close(fig)
+    _figures.clear()
+
+
+def submit(mode: str, jobs: list, func, *args, **kwargs) -> str:
+    """Run func(*args, **kwargs) now, skip it, or append it to `jobs`,
+    depending on the plot mode.
+
+    Returns the error of a job run now ("" when it succeeded or did not run)."""
+    if mode not in PLOT_MODES:
+        raise ValueError(f"Unknown plot mode: {mode}")
+    if mode == "full":
+        return _run_job((func, args, kwargs))
+    if mode == "deferred":
+        jobs.append((func, args, kwargs))
+    return ""
+
+
+def _run_job(job) -> str:
+    func, args, kwargs = job
+    try:
+        func(*args, **kwargs)
+    except Exception as exc:
+        traceback.print_exc()
+        return f"{type(exc).__name__}: {exc}"
+    return ""
+
+
+def run_job(job, log_path=None) -> str:
+    """Run one queued plot job and return its error ("" on success).
+
+    With log_path its output and traceback are appended to that file."""
+    if log_path is None:
+        return _run_job(job)
+    with open(log_path, "a", encoding="utf-8") as log, \
+            contextlib.redirect_stdout(log), contextlib.redirect_stderr(log):
+        return _run_job(job)
+
+
+def render_deferred(jobs: list, workers: int = 1, logs: list = None) -> list:
+    """Render queued plot jobs, on a pool of worker processes when workers > 1.
+
+    logs optionally gives the log file of every job (see run_job). Returns
+    the error of every job, "" for those that succeeded."""
+    logs = logs or [None] * len(jobs)
+    if workers <= 1 or len(jobs) <= 1:
+        return [run_job(job, log) for job, log in zip(jobs, logs)]
+    from concurrent.futures import ProcessPoolExecutor
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(run_job, jobs, logs))
@@ -0,0 +1,139 @@
+"""
+Resampling engine for the BCG signal.
+
+Chooses between rational polyphase resampling (resample_poly, which applies
+an anti-aliasing FIR low-pass) and linear interpolation, depending on how
+simple the ratio between the input and output rates is. Output timestamps
+are computed on an integer millisecond grid, so they do not drift on long
+recordings the way a float np.arange does.
+"""
+
+from fractions import Fraction
+from functools import lru_cache
+import numpy as np
+
+# largest up/down factor handled by the polyphase path; beyond it the FIR
+# filter (20 * max(up, down) taps) gets too long to be worth it
+MAX_POLYPHASE_FACTOR = 64
+
+# input samples processed per polyphase block
+BLOCK_SIZE = 1 << 18
+
+
+def rational_ratio(fs_in: float, fs_out: float, max_factor: int = MAX_POLYPHASE_FACTOR):
+    """Return (up, down) with fs_out / fs_in == up / down, or None when the
+    ratio needs factors larger than max_factor."""
+    ratio = Fraction(fs_out).limit_denominator(1000) / Fraction(fs_in).limit_denominator(1000)
+    if ratio.numerator > max_factor or ratio.denominator > max_factor:
+        return None
+    return ratio.numerator, ratio.denominator
+
+
+def time_grid_ms(t0_ms: int, n: int, fs: float, start: int = 0) -> np.ndarray:
+    """Integer timestamps (ms) of samples start..start+n-1 at rate fs, where
+    sample 0 lies at t0_ms.
+
+    Sample k lies at t0 + floor(k * 1000 / fs), computed in exact integer
+    arithmetic."""
+    rate = Fraction(fs).limit_denominator(1000)
+    k = np.arange(start, start + n, dtype=np.int64)
+    return np.int64(t0_ms) + (k * (1000 * rate.denominator)) // rate.numerator
+
+
+@lru_cache(maxsize=None)
+def _polyphase_filter(up: int, down: int) -> np.ndarray:
+    # the same design resample_poly uses by default, built once per ratio
+    from scipy.signal import firwin
+    max_rate = max(up, down)
+    return firwin(2 * 10 * max_rate + 1, 1. / max_rate, window=('kaiser', 5.0))
+
+
+def polyphase_blocks(blocks, up: int, down: int, block_size: int = BLOCK_SIZE):
+    """Resample a stream of 1-D input blocks with resample_poly.
+
+    Input of any block sizes is regrouped into segments of block_size
+    samples (rounded to a multiple of down); each segment is filtered together
+    with enough neighbouring samples on both sides to cover the FIR filter, so
+    the concatenated output equals resample_poly on the whole signal while
+    only a few segments are held in memory. Like resample_signal, the output
+    stops at the last sample strictly before the last input sample. The first
+    sample is subtracted before filtering and added back afterwards, so the
+    zero padding at the ends does not turn the DC level into a transient.
+    Yields output blocks.
+    """
+    from scipy.signal import resample_poly
+    h = _polyphase_filter(up, down)
+    half_len = (h.size - 1) // 2
+    pad = down * (-(-(half_len // up + 2) // down))  # filter reach, multiple of down
+    step = down * max(1, block_size // down)
+
+    buf = np.empty(0)
+    offset = None
+    start = 0  # global input index of the next segment, always a multiple of down
+    buf_start = 0  # global input index of buf[0]
+    for block in blocks:
+        block = np.asarray(block, dtype=np.float64)
+        if offset is None and block.size:
+            offset = block[0]
+        buf = np.concatenate((buf, block - offset if block.size else block))
+        while buf_start + buf.size >= start + step + pad:
+            lo = max(start - pad, 0)
+            segment = buf[lo - buf_start:start + step + pad - buf_start]
+            out = resample_poly(segment, up, down, window=h)
+            skip = (start - lo) * up // down
+            yield out[skip:skip + step * up // down] + offset
+            start += step
+            drop = max(start - pad, 0) - buf_start
+            buf = buf[drop:]
+            buf_start += drop
+
+    # flush the tail
+    end = buf_start + buf.size
+    if end > start:
+        lo = max(start - pad, 0)
+        out = resample_poly(buf[lo - buf_start:], up, down, window=h)
+        n_out = -(-(end - 1) * up // down)  # outputs before the last input sample
+        yield out[(start - lo) * up // down:n_out - lo * up // down] + offset
+
+
+def resample(signal: np.ndarray, t0_ms: int, fs_in: float, fs_out: float,
+             method: str = "auto", block_size: int = BLOCK_SIZE):
+    """Resample a uniformly sampled signal starting at t0_ms.
+
+    method is 'poly' (rational polyphase), 'interp' (linear interpolation,
+    preceded by an anti-aliasing low-pass when downsampling) or 'auto', which
+    uses polyphase whenever the rate ratio is a simple fraction. The output
+    covers the same span as resample_signal: the samples strictly before the
+    last input sample. Returns (timestamps_ms int64, values float64).
+    """
+    signal = np.asarray(signal, dtype=np.float64)
+    n_in = signal.size
+    ratio = rational_ratio(fs_in, fs_out)
+    if method == "auto":
+        method = "poly" if ratio is not None else "interp"
+    if method == "poly" and ratio is None:
+        raise ValueError(f"No polyphase ratio for {fs_in} Hz -> {fs_out} Hz")
+    if method not in ("poly", "interp"):
+        raise ValueError(f"Unknown resampling method: {method}")
+
+    if method == "poly":
+        up, down = ratio
+        blocks = (signal[i:i + block_size] for i in range(0, n_in, block_size))
+        values = np.concatenate(list(polyphase_blocks(blocks, up, down, block_size)) or [np.empty(0)])
+        return time_grid_ms(t0_ms, values.size, fs_out), values
+
+    span = Fraction(n_in - 1) * Fraction(fs_out).limit_denominator(1000) \
+        / Fraction(fs_in).limit_denominator(1000)
+    n_out = max(0, -(-span.numerator // span.denominator))
+    timestamps = time_grid_ms(t0_ms, n_out, fs_out)
+
+    if fs_out < fs_in:
+        # anti-aliasing low-pass at 80 % of the new Nyquist frequency
+        from scipy.signal import butter, sosfiltfilt
+        sos = butter(8, 0.8 * fs_out / fs_in, output='sos')
+        signal = sosfiltfilt(sos, signal)
+    # interpolate at the exact sample times; only the emitted timestamps are
+    # floored to whole milliseconds
+    t_in = np.arange(n_in) * (1000 / float(Fraction(fs_in).limit_denominator(1000)))
+    t_out = np.arange(n_out) * (1000 / float(Fraction(fs_out).limit_denominator(1000)))
+    return timestamps, np.interp(t_out, t_in, signal)
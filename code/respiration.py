@@ -0,0 +1,65 @@
+"""
+Respiration-rate estimation from the resampled BCG signal.
+
+Breathing lives below 0.4 Hz, so the signal is first decimated to a few Hz
+(polyphase, anti-aliased); detrending, the "breath" band-pass and peak
+detection then run on a tenth of the samples of the heart-rate stage.
+"""
+
+import numpy as np
+from band_pass_filtering import band_pass_filtering
+from compute_vitals import vitals_vectorized
+from remove_nonLinear_trend import remove_nonLinear_trend
+from resampling import polyphase_blocks
+
+BREATH_FS = 5.0  # Hz, plenty for 0.01-0.4 Hz content
+
+
+def downsample_for_breathing(signal: np.ndarray, fs: float, fs_breath: float = BREATH_FS) -> np.ndarray:
+    """Decimate the signal to fs_breath with an anti-aliasing polyphase filter."""
+    down = int(round(fs / fs_breath))
+    if down <= 1:
+        return np.asarray(signal, dtype=np.float64)
+    return np.concatenate(list(polyphase_blocks([signal], 1, down)) or [np.empty(0)])
+
+
+def compute_breathing_signal(signal: np.ndarray, fs: float, fs_breath: float = BREATH_FS) -> tuple[np.ndarray, float]:
+    """Downsample, detrend and band-pass (0.01-0.4 Hz) the BCG signal.
+
+    Returns the breathing signal and its sampling rate."""
+    low = downsample_for_breathing(signal, fs, fs_breath)
+    fs_low = fs / max(1, int(round(fs / fs_breath)))
+    detrended = remove_nonLinear_trend(low, 3)
+    return band_pass_filtering(detrended, fs_low, filter_type="breath"), fs_low
+
+
+def calculate_breath_rate_array(breath_signal: np.ndarray, fs: float, win_sec: int = 30) -> np.ndarray:
+    """Compute respiration rate (breaths/min) over non-overlapping windows."""
+    win_size = int(win_sec * fs)
+    window_limit = len(breath_signal) // win_size
+    time_ms = np.arange(len(breath_signal)) * (1000 / fs)
+    return vitals_vectorized(
+        t1=0,
+        t2=win_size,
+        win_size=win_size,
+        window_limit=window_limit,
+        sig=breath_signal,
+        time=time_ms,
+        mpd=int(2.0 * fs),  # Minimum breath distance = 2 sec (max 30 breaths/min)
+        plot=0
+    )
+
+
+def summarize_breathing(rates: np.ndarray) -> dict:
+    """Min / max / mean respiration rate over the windows with detected breaths."""
+    rates = np.asarray(rates, dtype=np.float64)
+    rates = rates[rates > 0]
+    if rates.size == 0:
+        summary = {"BR_min": np.nan, "BR_max": np.nan, "BR_mean": np.nan}
+    else:
+        summary = {"BR_min": rates.min(), "BR_max": rates.max(), "BR_mean": rates.mean()}
+    print("Respiratory Rate Information")
+    print("Minimum breathing : ", np.round(summary["BR_min"]))
+    print("Maximum breathing : ", np.round(summary["BR_max"]))
+    print("Average breathing : ", np.round(summary["BR_mean"]))
+    return summary
@@ -0,0 +1,233 @@
+"""
+Batched frequency-domain rate estimators.
+
+The filtered signal is viewed as a 2-D matrix of (possibly overlapping)
+windows without copying; blocks of windows are then transformed with a single
+rfft call along the last axis. Two estimators are provided:
+
+- spectral_rates: subharmonic summation on the Hann-windowed magnitude
+  spectrum. The BCG band-pass keeps little more than the 3rd and 4th
+  harmonics of the heart rate, so on the filtered spectrum many candidate
+  rates (3/4 f, 3/2 f, ...) explain the same strong line equally well. The
+  known filter response is therefore divided out wherever the filter passes
+  at least MIN_FILTER_GAIN, which brings back the weak fundamental and 5th
+  harmonic, and the harmonics are summed with decaying weights
+  HARMONIC_DECAY ** (h - 1), which favours the highest rate that explains
+  the lines. Every pick is then checked against its octaves: a rate whose
+  odd harmonics are missing is a subharmonic of 2f, and f/2 is taken when
+  its odd harmonics are present;
+- autocorr_rates: the lag of the largest autocorrelation peak in the band,
+  with the autocorrelation computed as irfft(|rfft|^2) of zero-padded windows.
+
+Both refine the maximum with parabolic interpolation and also return a
+quality in [0, 1], used by compute_vitals to fuse them with the peak engine;
+windows below a minimum quality get rate 0.0 (no rate), like the windows
+where the peak engine finds fewer than two beats.
+(channels, samples) signals are windowed along the last axis and the
+windows of all channels share the same blocks.
+pyFFTW is used as FFT backend when it is installed, scipy.fft otherwise.
+"""
+
+from functools import lru_cache
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+from scipy.fft import next_fast_len
+from band_pass_filtering import design_sos
+
+try:
+    import pyfftw
+    from pyfftw.interfaces import numpy_fft as _fft
+    pyfftw.interfaces.cache.enable()
+    FFT_BACKEND = "pyfftw"
+except ImportError:
+    from scipy import fft as _fft
+    FFT_BACKEND = "scipy"
+
+# windows transformed per rfft call, bounds the temporary memory
+BLOCK_WINDOWS = 2048
+
+# default rate band in Hz (40-180 bpm)
+HR_BAND = (40 / 60, 180 / 60)
+
+# spectral_rates: weight of harmonic h is HARMONIC_DECAY ** (h - 1)
+HARMONIC_DECAY = 0.84
+# frequencies where the (zero-phase) band-pass gain is below this are ignored
+MIN_FILTER_GAIN = 0.01
+# a candidate whose odd harmonics hold less than this share of its even
+# harmonics' magnitude is a subharmonic (see _octave_check)
+MIN_ODD_RATIO = 0.3
+# windows below these qualities (noise, no heart beat) are left at rate 0
+SPECTRAL_MIN_QUALITY = 0.6
+AUTOCORR_MIN_QUALITY = 0.5
+
+
+def window_matrix(sig: np.ndarray, win_size: int, hop: int = None) -> np.ndarray:
+    """Read-only (..., windows, win_size) view of sig, windowed along its last
+    axis with a window every hop samples (default: non-overlapping)."""
+    sig = np.asarray(sig)
+    if sig.shape[-1] < win_size:
+        return np.empty(sig.shape[:-1] + (0, win_size), dtype=sig.dtype)
+    return sliding_window_view(sig, win_size, axis=-1)[..., ::hop or win_size, :]
+
+
+def _parabolic(values: np.ndarray, idx: np.ndarray) -> np.ndarray:
+    """Sub-bin offset of the maxima at idx (one per row) by parabola fit."""
+    rows = np.arange(values.shape[0])
+    inner = (idx > 0) & (idx < values.shape[1] - 1)
+    left = values[rows, np.clip(idx - 1, 0, None)]
+    mid = values[rows, idx]
+    right = values[rows, np.clip(idx + 1, None, values.shape[1] - 1)]
+    denom = left - 2 * mid + right
+    with np.errstate(divide='ignore', invalid='ignore'):
+        offset = np.where(inner & (denom < 0), 0.5 * (left - right) / denom, 0.0)
+    return offset
+
+
+def _blocks(windows: np.ndarray):
+    """Mean-removed float64 blocks of at most BLOCK_WINDOWS windows; the
+    windows of all channels are taken in row-major order."""
+    lead = windows.shape[:-1]
+    n_rows = int(np.prod(lead))
+    for i in range(0, n_rows, BLOCK_WINDOWS):
+        if windows.ndim == 2:
+            block = windows[i:i + BLOCK_WINDOWS].astype(np.float64)
+        else:
+            rows = np.unravel_index(np.arange(i, min(i + BLOCK_WINDOWS, n_rows)), lead)
+            block = windows[rows].astype(np.float64, copy=False)
+        yield i, block - block.mean(axis=1, keepdims=True)
+
+
+@lru_cache(maxsize=None)
+def _inverse_gain(fs: float, nfft: int, prefilter: str) -> np.ndarray:
+    """1 / gain of the zero-phase band-pass `prefilter` on the rfft bins, 0
+    where the gain is below MIN_FILTER_GAIN (all ones without prefilter).
+    The cached array is shared: do not modify it in place."""
+    freqs = np.arange(nfft // 2 + 1) * fs / nfft
+    if prefilter is None:
+        return np.ones(freqs.size)
+    from scipy.signal import sosfreqz
+    _, response = sosfreqz(design_sos(fs, prefilter), worN=freqs, fs=fs)
+    gain = np.abs(response) ** 2  # filtered forwards and backwards
+    return np.where(gain >= MIN_FILTER_GAIN, 1 / np.maximum(gain, MIN_FILTER_GAIN), 0.0)
+
+
+def _harmonic_sum(mag: np.ndarray, candidates: np.ndarray, weights) -> np.ndarray:
+    """(rows, candidates) sum over h of weights[h - 1] * mag at h * candidate;
+    harmonics beyond the spectrum count as 0."""
+    score = np.zeros((mag.shape[0], candidates.size))
+    for h, weight in enumerate(weights, start=1):
+        bins = candidates * h
+        keep = bins < mag.shape[1]
+        score[:, keep] += weight * mag[:, bins[keep]]
+    return score
+
+
+def _odd_ratio(mag: np.ndarray, picks: np.ndarray, harmonics: int) -> np.ndarray:
+    """Magnitude at the odd over that at the even harmonics of every row's pick."""
+    rows = np.arange(mag.shape[0])
+    odd, even = np.zeros(picks.size), np.zeros(picks.size)
+    for h in range(1, harmonics + 1):
+        bins = np.minimum(picks * h, mag.shape[1] - 1)
+        values = np.where(picks * h < mag.shape[1], mag[rows, bins], 0.0)
+        if h % 2:
+            odd += values
+        else:
+            even += values
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return odd / even
+
+
+def _octave_check(mag: np.ndarray, picks: np.ndarray, lo: int, hi: int, harmonics: int):
+    """Bins of the picks moved by an octave where the octave is the better
+    fundamental: up to 2f when the odd harmonics of f are (nearly) missing,
+    down to f/2 when the odd harmonics of f/2 are present."""
+    up = 2 * picks
+    picks = np.where((up < hi) & (_odd_ratio(mag, picks, harmonics) < MIN_ODD_RATIO),
+                     up, picks)
+    down = np.rint(picks / 2).astype(picks.dtype)
+    return np.where((down >= lo) & (_odd_ratio(mag, down, harmonics) >= MIN_ODD_RATIO),
+                    down, picks)
+
+
+def spectral_rates(sig, fs: float, win_size: int, hop: int = None, band=HR_BAND,
+                   harmonics: int = 5, pad_factor: int = 4, prefilter: str = "bcg",
+                   min_quality: float = SPECTRAL_MIN_QUALITY):
+    """Rate (per minute) and quality of every window from its spectrum
+    (subharmonic summation, see the module docstring).
+
+    prefilter is the band_pass_filtering type sig was filtered with, whose
+    response is divided out (None for an unfiltered signal). Quality is the
+    share of the (filter-compensated) spectral power within one bin of the
+    rate's harmonics; windows below min_quality (noise, no heart beat) get
+    rate 0.0.
+    sig may be (channels, samples), giving (channels, windows) results."""
+    windows = window_matrix(sig, win_size, hop)
+    lead = windows.shape[:-1]
+    rates, quality = np.zeros(lead), np.zeros(lead)
+    if rates.size == 0:
+        return rates, quality
+    rates, quality = rates.reshape(-1), quality.reshape(-1)
+    nfft = next_fast_len(pad_factor * win_size)
+    lo = int(np.ceil(band[0] * nfft / fs))
+    hi = int(np.floor(band[1] * nfft / fs)) + 1
+    candidates = np.arange(lo, hi)
+    weights = [HARMONIC_DECAY ** (h - 1) for h in range(1, harmonics + 1)]
+    inverse_gain = _inverse_gain(float(fs), nfft, prefilter)
+    taper = np.hanning(win_size)
+    lobe = nfft // win_size  # one bin of the unpadded spectrum
+
+    for i, block in _blocks(windows):
+        rows = np.arange(block.shape[0])
+        mag = np.abs(_fft.rfft(block * taper, n=nfft, axis=1)) * inverse_gain
+        score = _harmonic_sum(mag, candidates, weights)
+        picks = _octave_check(mag, np.argmax(score, axis=1) + lo, lo, hi, harmonics)
+        idx = picks - lo
+        peak = (picks + _parabolic(score, idx)) * fs / nfft
+
+        # quality: power within one unpadded bin of the harmonics of the pick
+        power = np.cumsum(mag ** 2, axis=1)
+        captured = np.zeros(block.shape[0])
+        for h in range(1, harmonics + 1):
+            left = np.clip(h * picks - lobe - 1, 0, power.shape[1] - 1)
+            right = np.clip(h * picks + lobe, 0, power.shape[1] - 1)
+            captured += power[rows, right] - power[rows, left]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            q = np.nan_to_num(captured / power[:, -1])
+        rates[i:i + block.shape[0]] = np.where(q >= min_quality, peak * 60, 0.0)
+        quality[i:i + block.shape[0]] = q
+    return np.round(rates, 2).reshape(lead), quality.reshape(lead)
+
+
+def autocorr_rates(sig, fs: float, win_size: int, hop: int = None, band=HR_BAND,
+                   min_quality: float = AUTOCORR_MIN_QUALITY):
+    """Rate (per minute) and quality of every window from its autocorrelation.
+
+    Quality is the normalised autocorrelation at the selected lag; windows
+    below min_quality get rate 0.0. sig may be (channels, samples), giving
+    (channels, windows) results."""
+    windows = window_matrix(sig, win_size, hop)
+    lead = windows.shape[:-1]
+    rates, quality = np.zeros(lead), np.zeros(lead)
+    if rates.size == 0:
+        return rates, quality
+    nfft = next_fast_len(2 * win_size)
+    lag_lo = max(1, int(np.floor(fs / band[1])))
+    lag_hi = min(win_size - 1, int(np.ceil(fs / band[0])))
+    if lag_hi <= lag_lo:
+        return rates, quality
+    rates, quality = rates.reshape(-1), quality.reshape(-1)
+
+    for i, block in _blocks(windows):
+        spectrum = _fft.rfft(block, n=nfft, axis=1)
+        acf = _fft.irfft(spectrum.real ** 2 + spectrum.imag ** 2, n=nfft, axis=1)[:, :lag_hi + 1]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            acf = acf / acf[:, :1]
+        acf = np.nan_to_num(acf)
+        segment = acf[:, lag_lo:lag_hi + 1]
+        idx = np.argmax(segment, axis=1)
+        lag = idx + lag_lo + _parabolic(segment, idx)
+        q = segment[np.arange(block.shape[0]), idx]
+        ok = (q > 0) & (q >= min_quality)
+        rates[i:i + block.shape[0]][ok] = 60 * fs / lag[ok]
+        quality[i:i + block.shape[0]] = np.clip(q, 0, 1)
+    return np.round(rates, 2).reshape(lead), quality.reshape(lead)
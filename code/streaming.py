@@ -0,0 +1,77 @@
+"""
+Streaming (real-time) BCG heart-rate estimation.
+
+Chunks of raw samples are filtered causally with second-order sections whose
+state (`zi`) is carried from one chunk to the next, and a heart rate is
+emitted as soon as a window has been filled. Memory use is one window buffer
+regardless of how long the stream runs, and the latency is one window plus
+the group delay of the filter.
+"""
+
+import numpy as np
+import pandas as pd
+from scipy.signal import sosfilt, sosfilt_zi
+from band_pass_filtering import design_sos
+from beat_to_beat import compute_rate
+
+
+class StreamingHeartRate:
+    """Incremental counterpart of filtering + calculate_bpm_array.
+
+    Feed raw samples with `push`; each call returns the (timestamp_ms, bpm)
+    pairs of the windows completed by that chunk.
+    """
+
+    def __init__(self, fs: float, win_sec: int = 10, t0_ms: float = 0.0, filter_type: str = "bcg"):
+        self.fs = fs
+        self.win_size = int(win_sec * fs)
+        self.mpd = int(0.5 * fs)  # Minimum peak distance = 0.5 sec
+        self.t0_ms = t0_ms
+        self.sos = design_sos(fs, filter_type)
+        self._zi = None
+        self._time = np.arange(self.win_size) * (1000 / fs)
+        self._window = np.empty(self.win_size)
+        self._filled = 0
+        self._n_windows = 0
+
+    def push(self, samples) -> list[tuple[float, float]]:
+        """Filter a chunk of raw samples and return the completed windows' BPM."""
+        x = np.asarray(samples, dtype=np.float64)
+        if x.size == 0:
+            return []
+        if self._zi is None:
+            # start in steady state for the first sample to avoid a step transient
+            self._zi = sosfilt_zi(self.sos) * x[0]
+        y, self._zi = sosfilt(self.sos, x, zi=self._zi)
+
+        completed = []
+        i = 0
+        while i < y.size:
+            take = min(self.win_size - self._filled, y.size - i)
+            self._window[self._filled:self._filled + take] = y[i:i + take]
+            self._filled += take
+            i += take
+            if self._filled == self.win_size:
+                rate, _ = compute_rate(self._window, self._time, self.mpd)
+                start_ms = self.t0_ms + self._n_windows * self.win_size * (1000 / self.fs)
+                completed.append((start_ms, rate))
+                self._n_windows += 1
+                self._filled = 0
+        return completed
+
+
+def stream_bcg_csv(file_path: str, chunk_size: int = 1000, win_sec: int = 10):
+    """Replay a raw BCG CSV chunk by chunk, yielding (timestamp_ms, bpm) pairs."""
+    processor = None
+    for chunk in pd.read_csv(file_path, header=0, names=['BCG', 'Timestamp', 'fs'],
+                             dtype=float, chunksize=chunk_size):
+        if processor is None:
+            processor = StreamingHeartRate(chunk['fs'].iloc[0], win_sec=win_sec,
+                                           t0_ms=chunk['Timestamp'].iloc[0])
+        yield from processor.push(chunk['BCG'].values)
+
+
+if __name__ == '__main__':
+    import sys
+    for timestamp, bpm in stream_bcg_csv(sys.argv[1]):
+        print(f"{int(timestamp)},{bpm}")
@@ -1,55 +1,173 @@
+import numpy as np
 import pandas as pd
-from scipy.signal import resample_poly
-def synchronize_signals(bcg_path, rr_path, output_bcg_path, output_rr_path):
+import input_cache
+import change_timestamp as ct
+
+# how timestamps are written to the synchronized CSVs
+EXPORT_TIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+
+def parse_rr_csv(rr_path):
+    """Parse a reference RR CSV into int64 epoch-ms timestamps and float columns."""
+    rr = pd.read_csv(rr_path, parse_dates=["Timestamp"], date_format={"Timestamp": "%Y/%m/%d %H:%M:%S"})
+    columns = {"Timestamp": rr["Timestamp"].values.astype("datetime64[ms]").astype(np.int64)}
+    for name in rr.columns.drop("Timestamp"):
+        columns[name] = rr[name].to_numpy(dtype=np.float64)
+    return columns, {}
+
+
+def load_rr_columns(rr_path):
+    """Load a reference RR CSV (through the binary input cache) as a dict of
+    arrays; "Timestamp" holds int64 epoch milliseconds."""
+    columns, _ = input_cache.load_columns(rr_path, parse_rr_csv, tag="rr")
+    return columns
+
+
+def load_rr_data(rr_path):
+    """Load a reference RR CSV (through the binary input cache) indexed by its timestamps."""
+    columns = load_rr_columns(rr_path)
+    index = pd.DatetimeIndex(np.asarray(columns["Timestamp"]).astype("datetime64[ms]"), name="Timestamp")
+    return pd.DataFrame({name: np.asarray(values) for name, values in columns.items()
+                         if name != "Timestamp"}, index=index)
+
+
+def median_by_timestamp(timestamps, values):
     """
-    Synchronize two time-series CSV files based on exact timestamp overlap.
-    - Ensures both outputs have identical timestamps and row count.
-    - Resolves duplicate timestamps in RR using median.
+    Collapse duplicate timestamps into the median of their rows.
+    - timestamps: int64 array (n,); values: float array (n, columns).
+    - NaNs are ignored like in pandas' groupby().median().
+    Returns the sorted unique timestamps and the (unique, columns) medians.
     """
+    timestamps = np.asarray(timestamps, dtype=np.int64)
+    values = np.asarray(values, dtype=np.float64).reshape(len(timestamps), -1)
+    unique = np.unique(timestamps)
+    medians = np.full((unique.size, values.shape[1]), np.nan)
+    for j in range(values.shape[1]):
+        valid = ~np.isnan(values[:, j])
+        keys, column = timestamps[valid], values[valid, j]
+        order = np.lexsort((column, keys))
+        keys, column = keys[order], column[order]
+        group_keys, first, counts = np.unique(keys, return_index=True, return_counts=True)
+        # mean of the two middle elements (the same element for odd counts)
+        median = (column[first + (counts - 1) // 2] + column[first + counts // 2]) / 2
+        medians[np.searchsorted(unique, group_keys), j] = median
+    return unique, medians
 
-    # Load CSVs and parse timestamps
-    bcg = pd.read_csv(bcg_path, parse_dates=["Timestamp"], date_format={"Timestamp": "%Y/%m/%d %H:%M:%S"}).set_index("Timestamp")
-    rr = pd.read_csv(rr_path, parse_dates=["Timestamp"], date_format={"Timestamp": "%Y/%m/%d %H:%M:%S"}).set_index("Timestamp")
 
-    # print timestamp data type for bcg and rr also print the first value of this data type
-    # print(f"BCG Timestamp dtype: {bcg.index.dtype}")
-    # print(f"RR Timestamp dtype: {rr.index.dtype}")
-    # print(f"BCG Timestamp first value: {bcg.index[0]}")
-    # print(f"RR Timestamp first value: {rr.index[0]}")
-
-    # Handle duplicate timestamps using median
-    bcg = bcg.groupby(bcg.index).median()
-    # bcg = resample_poly(bcg, up=1, down=50)
-    rr = rr.groupby(rr.index).median()
+def match_timestamps(bcg_ms, rr_ms, tolerance_ms=0):
+    """
+    Pair sorted unique timestamps in a single sorted merge.
+    - Each BCG timestamp is matched to the nearest RR timestamp within
+      tolerance_ms (0 = exact matches only); an RR timestamp is used at most
+      once, by its closest BCG timestamp.
+    Returns the index arrays (bcg_idx, rr_idx) of the matched pairs.
+    """
+    if len(bcg_ms) == 0 or len(rr_ms) == 0:
+        empty = np.array([], dtype=np.intp)
+        return empty, empty
+    right = np.searchsorted(rr_ms, bcg_ms)
+    left = np.clip(right - 1, 0, len(rr_ms) - 1)
+    right = np.clip(right, 0, len(rr_ms) - 1)
+    use_left = np.abs(bcg_ms - rr_ms[left]) <= np.abs(rr_ms[right] - bcg_ms)
+    rr_idx = np.where(use_left, left, right)
+    distance = np.abs(rr_ms[rr_idx] - bcg_ms)
+    bcg_idx = np.flatnonzero(distance <= tolerance_ms)
+    rr_idx, distance = rr_idx[bcg_idx], distance[bcg_idx]
+    if tolerance_ms > 0 and rr_idx.size:
+        # keep the closest BCG timestamp for every RR timestamp
+        order = np.lexsort((distance, rr_idx))
+        first = np.unique(rr_idx[order], return_index=True)[1]
+        keep = np.sort(order[first])
+        bcg_idx, rr_idx = bcg_idx[keep], rr_idx[keep]
+    return bcg_idx, rr_idx
 
-    # Determine common timestamp range
-    start = max(bcg.index.min(), rr.index.min())
-    end = min(bcg.index.max(), rr.index.max())
 
+def synchronize_arrays(bcg_ms, bcg_values, rr_ms, rr_values, tolerance_ms=0):
+    """
+    Synchronize two int64 epoch-ms time series.
+    - Resolves duplicate timestamps using median.
+    - Aligns them with match_timestamps; matched rows are reported at the BCG
+      timestamp, so both outputs have identical timestamps and row count.
+    Returns (timestamps_ms, bcg_sync, rr_sync).
+    """
+    bcg_ms, bcg_values = median_by_timestamp(bcg_ms, bcg_values)
+    rr_ms, rr_values = median_by_timestamp(rr_ms, rr_values)
+    bcg_idx, rr_idx = match_timestamps(bcg_ms, rr_ms, tolerance_ms)
 
-    # Trim to common range
-    bcg = bcg.loc[start:end]
-    rr = rr.loc[start:end]
+    if len(bcg_ms) and len(rr_ms):
+        start = max(bcg_ms[0], rr_ms[0])
+        end = min(bcg_ms[-1], rr_ms[-1])
+        kind = "exact-matching" if tolerance_ms == 0 else f"matching (±{tolerance_ms} ms)"
+        print(f"Synchronized from {pd.Timestamp(start, unit='ms')} to {pd.Timestamp(end, unit='ms')}, "
+              f"with {len(bcg_idx)} {kind} timestamps.")
+    return bcg_ms[bcg_idx], bcg_values[bcg_idx], rr_values[rr_idx]
 
-    # Intersect timestamps to ensure identical index
-    common_index = bcg.index.intersection(rr.index)
 
-    bcg_sync = bcg.loc[common_index].sort_index()
-    rr_sync = rr.loc[common_index].sort_index()
-    
-    # Save to specified output paths
-    bcg_sync.to_csv(output_bcg_path)
-    rr_sync.to_csv(output_rr_path)
+def build_sync_frames(timestamps_ms, bcg_names, bcg_sync, rr_names, rr_sync):
+    """Wrap synchronized arrays into (bcg_sync, rr_sync, merged) DataFrames.
 
+    Timestamps stay int64 epoch ms; they are only formatted by save_synchronized."""
+    index = pd.Index(np.asarray(timestamps_ms, dtype=np.int64), name="Timestamp")
+    bcg_df = pd.DataFrame(bcg_sync, index=index, columns=list(bcg_names))
+    rr_df = pd.DataFrame(rr_sync, index=index, columns=list(rr_names))
     # Merge synchronized DataFrames into one with three columns: Timestamp, RR_HR, BCG_HR
     merged = pd.DataFrame({
-        "Timestamp": common_index,
-        "RR_HR": rr_sync.iloc[:, 0].values,
-        "BCG_HR": bcg_sync.iloc[:, 0].values
+        "Timestamp": index,
+        "RR_HR": rr_sync[:, 0],
+        "BCG_HR": bcg_sync[:, 0]
     })
-    merged.to_csv(output_bcg_path+'___Merged.csv', index=False)
+    return bcg_df, rr_df, merged
+
 
-    print(f"Synchronized from {start} to {end}, with {len(common_index)} exact-matching timestamps.")
+def join_sync_frames(bcg_sync, rr_sync):
+    """One Timestamp-indexed table with the synchronized BCG columns followed
+    by all reference RR columns (e.g. Heart Rate, RR Interval in seconds)."""
+    joined = bcg_sync.copy()
+    for name in rr_sync.columns:
+        joined[name] = rr_sync[name].values
+    return joined
+
+
+def synchronize_frames(bcg, rr, tolerance_ms=0):
+    """
+    Synchronize two timestamp-indexed DataFrames (see synchronize_arrays).
+
+    Returns (bcg_sync, rr_sync, merged) where merged holds the columns
+    Timestamp, RR_HR and BCG_HR.
+    """
+    timestamps, bcg_sync, rr_sync = synchronize_arrays(
+        bcg.index.values.astype("datetime64[ms]").astype(np.int64), bcg.values,
+        rr.index.values.astype("datetime64[ms]").astype(np.int64), rr.values,
+        tolerance_ms
+    )
+    return build_sync_frames(timestamps, bcg.columns, bcg_sync, rr.columns, rr_sync)
+
+
+def save_synchronized(bcg_sync, rr_sync, merged, output_bcg_path, output_rr_path, write_merged=True):
+    """Write the synchronized tables; the merged table goes next to the BCG output."""
+    ct.export_with_formatted_timestamps(bcg_sync, output_bcg_path, time_format=EXPORT_TIME_FORMAT, index=True)
+    ct.export_with_formatted_timestamps(rr_sync, output_rr_path, time_format=EXPORT_TIME_FORMAT, index=True)
+    if write_merged:
+        ct.export_with_formatted_timestamps(merged, str(output_bcg_path) + '___Merged.csv',
+                                            time_format=EXPORT_TIME_FORMAT)
+
+
+def synchronize_signals(bcg_path, rr_path, output_bcg_path, output_rr_path, tolerance_ms=0):
+    """
+    Synchronize two time-series CSV files based on timestamp overlap.
+    - Ensures both outputs have identical timestamps and row count.
+    - Resolves duplicate timestamps in RR using median.
+    - tolerance_ms > 0 also aligns timestamps that are off by up to that much.
+    """
+
+    # Load CSVs and parse timestamps
+    bcg = pd.read_csv(bcg_path, parse_dates=["Timestamp"], date_format={"Timestamp": "%Y/%m/%d %H:%M:%S"}).set_index("Timestamp")
+    rr = load_rr_data(rr_path)
+
+    bcg_sync, rr_sync, merged = synchronize_frames(bcg, rr, tolerance_ms)
+
+    # Save to specified output paths
+    save_synchronized(bcg_sync, rr_sync, merged, output_bcg_path, output_rr_path)
 
 # # Example usage:
 # synchronize_signals(
@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# the pipeline modules live flat in code/, like main.py imports them
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
@@ -0,0 +1,53 @@
+"""Spectral and autocorrelation rate engines on synthetic BCG (spectral.py)."""
+
+import numpy as np
+import pytest
+import BCG_heartrate as BCG_hr
+import spectral
+from benchmarks.synthetic import synthetic_bcg
+
+FS = 50
+WIN_SIZE = 10 * FS
+ENGINES = [spectral.spectral_rates, spectral.autocorr_rates]
+
+
+def filtered(sig):
+    return BCG_hr.compute_filtered_signal(sig, FS)
+
+
+@pytest.mark.parametrize("engine", ENGINES, ids=lambda f: f.__name__)
+@pytest.mark.parametrize("hr", [45, 55, 70, 80, 95, 110, 125, 140])
+def test_constant_heart_rate(engine, hr):
+    sig, _ = synthetic_bcg(5, FS, hr_mean=hr, hr_swing=0, noise=20)
+    rates, quality = engine(filtered(sig), FS, WIN_SIZE)
+    assert rates.size == 30
+    np.testing.assert_allclose(rates, hr, atol=1.0)
+    assert (quality > 0.5).all()
+
+
+@pytest.mark.parametrize("engine", ENGINES, ids=lambda f: f.__name__)
+def test_varying_heart_rate(engine):
+    sig, hr = synthetic_bcg(30, FS, noise=20)
+    truth = hr[:hr.size // WIN_SIZE * WIN_SIZE].reshape(-1, WIN_SIZE).mean(axis=1)
+    rates, _ = engine(filtered(sig), FS, WIN_SIZE)
+    error = np.abs(rates - truth)
+    assert error.mean() <= 1.0
+    assert (error > 10).mean() <= 0.01
+
+
+@pytest.mark.parametrize("engine", ENGINES, ids=lambda f: f.__name__)
+def test_noise_gives_no_rate(engine):
+    noise = 2000 + 60 * np.random.default_rng(5).standard_normal(10 * 60 * FS)
+    rates, _ = engine(filtered(noise), FS, WIN_SIZE)
+    assert (rates == 0.0).all()
+
+
+def test_batched_channels_match_single():
+    sig = np.stack([synthetic_bcg(3, FS, hr_mean=hr, seed=hr)[0] for hr in (60, 90, 120)])
+    x = filtered(sig)
+    for engine in ENGINES:
+        rates, quality = engine(x, FS, WIN_SIZE)
+        for channel in range(x.shape[0]):
+            single, single_quality = engine(x[channel], FS, WIN_SIZE)
+            np.testing.assert_array_equal(rates[channel], single)
+            np.testing.assert_allclose(quality[channel], single_quality)
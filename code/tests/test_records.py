@@ -0,0 +1,46 @@
+"""Signal buffers of the pipeline records (records.py)."""
+
+import numpy as np
+import pandas as pd
+import BCG_heartrate as BCG_hr
+from records import MAX_EXACT_COUNT, Recording, WindowRates, as_counts, as_signal
+
+
+def test_small_counts_are_float32():
+    counts = np.array([-MAX_EXACT_COUNT, 0, MAX_EXACT_COUNT], dtype=np.int64)
+    assert as_counts(counts).dtype == np.float32
+    assert as_signal(counts.astype(np.float64)).dtype == np.float32
+    np.testing.assert_array_equal(as_counts(counts), counts)
+
+
+def test_large_counts_stay_exact():
+    counts = np.array([0, MAX_EXACT_COUNT + 1, -(2 ** 30) - 3], dtype=np.int64)
+    assert as_counts(counts).dtype == np.float64
+    np.testing.assert_array_equal(as_counts(counts), counts)
+    recording = Recording.from_timestamps(np.arange(3) * 20, counts, 50)
+    np.testing.assert_array_equal(recording.to_frame()['BCG'].values, counts)
+
+
+def test_counts_are_truncated():
+    np.testing.assert_array_equal(as_counts(np.array([1.7, -1.7, 3e7 + 0.5])),
+                                  [1.0, -1.0, 3e7])
+
+
+def test_bpm_dataframe_matches_window_rates():
+    timestamps = 1_700_000_000_000 + np.arange(1000) * 20
+    bpm = np.array([60.0, 61.5, np.nan])
+    artifacts = np.array([False, False, True, False])
+    df = BCG_hr.build_bpm_dataframe(bpm, timestamps, 50, win_sec=5, artifacts=artifacts)
+    expected = pd.DataFrame({'Timestamp': timestamps[::250][:3], 'Heart Rate': bpm,
+                             'Artifact': artifacts[:3]})
+    pd.testing.assert_frame_equal(df, expected)
+    recording = Recording.from_timestamps(timestamps, np.zeros(1000), 50)
+    pd.testing.assert_frame_equal(recording.windows(bpm, 250, 'Heart Rate', artifacts).to_frame(),
+                                  df)
+
+
+def test_fractional_rate_survives_frame_round_trip():
+    recording = Recording.from_timestamps(np.arange(4) * 7, np.arange(4), 142.5)
+    df = recording.to_frame()
+    assert df['fs'].dtype == np.float64
+    assert Recording.from_frame(df).fs == 142.5
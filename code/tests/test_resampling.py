@@ -0,0 +1,24 @@
+"""In-memory and chunked resampling (generate_timestamp_and_resampling.py)."""
+
+import numpy as np
+import pytest
+import generate_timestamp_and_resampling as gtr
+from benchmarks.synthetic import write_recording
+
+FS_NEW = 50.0
+
+
+@pytest.fixture(scope="module")
+def bcg_path(tmp_path_factory):
+    # a non-integer raw rate, which must not be truncated to 142 Hz
+    return write_recording(tmp_path_factory.mktemp("data"), minutes=2, fs=142.5)[0]
+
+
+@pytest.mark.parametrize("method", ["poly", "auto"])
+def test_in_memory_matches_chunked(bcg_path, method, monkeypatch):
+    monkeypatch.setenv("BCG_CACHE_DIR", "")
+    in_memory = gtr.resample_recording(gtr.load_recording(str(bcg_path)), FS_NEW, method=method)
+    chunked = gtr.resample_file_recording(str(bcg_path), FS_NEW, chunk_size=5000, method=method)
+    assert len(in_memory) == len(chunked) == 6000
+    np.testing.assert_array_equal(in_memory.timestamps, chunked.timestamps)
+    np.testing.assert_array_equal(in_memory.bcg, chunked.bcg)
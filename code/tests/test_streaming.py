@@ -0,0 +1,53 @@
+"""Streaming heart rate (streaming.StreamingHeartRate) against the offline path."""
+
+import numpy as np
+import pytest
+import BCG_heartrate as BCG_hr
+from streaming import StreamingHeartRate
+from benchmarks.synthetic import synthetic_bcg
+
+FS = 50
+WIN_SEC = 10
+
+
+@pytest.fixture(scope="module")
+def recording():
+    sig, hr = synthetic_bcg(10, FS)
+    win_size = WIN_SEC * FS
+    truth = hr[:hr.size // win_size * win_size].reshape(-1, win_size).mean(axis=1)
+    return sig, truth
+
+
+def stream(sig, chunk_sizes):
+    processor = StreamingHeartRate(FS, win_sec=WIN_SEC)
+    cuts = np.cumsum(chunk_sizes)
+    return np.array([bpm for chunk in np.split(sig, cuts[cuts < sig.size])
+                     for _, bpm in processor.push(chunk)])
+
+
+def test_matches_offline(recording):
+    sig, truth = recording
+    online = stream(sig, np.full(sig.size, 1000))
+    offline = BCG_hr.calculate_bpm_array(BCG_hr.compute_filtered_signal(sig, FS), FS, WIN_SEC)
+    assert online.size == offline.size
+    # the first window contains the causal filter's start-up transient
+    diff = np.abs(online[1:] - offline[1:])
+    assert np.percentile(diff, 95) <= 5.0
+    assert diff.max() <= 10.0
+    assert np.mean(np.abs(online[1:] - truth[1:])) <= 1.5
+
+
+def test_chunk_size_has_no_effect(recording):
+    sig, _ = recording
+    reference = stream(sig, [sig.size])
+    rng = np.random.default_rng(1)
+    for chunk_sizes in (np.full(sig.size, 1), np.full(sig.size, 37),
+                        rng.integers(1, 2 * FS, sig.size)):
+        np.testing.assert_array_equal(stream(sig, chunk_sizes), reference)
+
+
+def test_timestamps_follow_windows():
+    processor = StreamingHeartRate(FS, win_sec=WIN_SEC, t0_ms=1000.0)
+    sig, _ = synthetic_bcg(1, FS)
+    timestamps = [t for t, _ in processor.push(sig)]
+    assert timestamps == [1000.0 + i * WIN_SEC * 1000 for i in range(len(timestamps))]
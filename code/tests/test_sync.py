@@ -0,0 +1,40 @@
+"""BCG/RR synchronization of the pipeline (pipeline.sync_stage)."""
+
+import numpy as np
+import pandas as pd
+import pytest
+import pipeline
+from records import WindowRates
+
+T0_MS = 1_699_142_400_000  # 2023-11-05 00:00:00
+
+
+@pytest.fixture
+def rr_path(tmp_path, monkeypatch):
+    monkeypatch.setenv("BCG_CACHE_DIR", "")
+    seconds = np.arange(0, 60)
+    path = tmp_path / "rr.csv"
+    pd.DataFrame({
+        "Timestamp": pd.to_datetime(T0_MS + seconds * 1000, unit="ms").strftime("%Y/%m/%d %H:%M:%S"),
+        "Heart Rate": 60.0 + seconds,
+        "RR Interval in seconds": 60 / (60.0 + seconds),
+    }).to_csv(path, index=False)
+    return path
+
+
+def window_rates():
+    # windows every 10 s, starting 600 ms after the second
+    offsets = np.arange(0, 50_000, 10_000) + 600
+    return WindowRates(T0_MS, offsets, np.full(offsets.size, 70.0), "Heart Rate")
+
+
+def test_exact_matching_truncates_to_seconds(rr_path):
+    bcg_sync, rr_sync, _ = pipeline.sync_stage(window_rates(), rr_path)
+    np.testing.assert_array_equal(bcg_sync.index.values, T0_MS + np.arange(0, 50_000, 10_000))
+    np.testing.assert_array_equal(rr_sync["Heart Rate"].values, [60, 70, 80, 90, 100])
+
+
+@pytest.mark.parametrize("tolerance_ms, expected", [(300, []), (500, [61, 71, 81, 91, 101])])
+def test_tolerance_below_one_second(rr_path, tolerance_ms, expected):
+    _, rr_sync, _ = pipeline.sync_stage(window_rates(), rr_path, tolerance_ms=tolerance_ms)
+    np.testing.assert_array_equal(rr_sync["Heart Rate"].values, expected)
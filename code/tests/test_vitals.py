@@ -0,0 +1,42 @@
+"""Peak-based window engines (compute_vitals.py)."""
+
+import numpy as np
+import pytest
+import BCG_heartrate as BCG_hr
+from compute_vitals import estimate_rates, vitals, vitals_vectorized
+from benchmarks.synthetic import synthetic_bcg
+
+FS = 50
+WIN_SIZE = 10 * FS
+MPD = FS // 2
+
+
+@pytest.mark.parametrize("seed", range(10))
+@pytest.mark.parametrize("step", [1, 25])
+def test_vectorized_matches_vitals_on_counts(seed, step):
+    # whole (and coarsely quantized) ADC counts: many peaks of equal height
+    sig, _ = synthetic_bcg(3, FS, seed=seed)
+    sig = np.round(sig / step)
+    n_windows = sig.size // WIN_SIZE
+    time = np.arange(sig.size) * (1000 / FS)
+    expected = vitals(0, WIN_SIZE, WIN_SIZE, n_windows, sig, time, MPD)
+    np.testing.assert_array_equal(
+        vitals_vectorized(0, WIN_SIZE, WIN_SIZE, n_windows, sig, time, MPD), expected)
+
+
+@pytest.mark.parametrize("seed", range(10))
+def test_vectorized_matches_vitals_on_floats(seed):
+    sig, _ = synthetic_bcg(3, FS, seed=seed)
+    n_windows = sig.size // WIN_SIZE
+    time = np.arange(sig.size) * (1000 / FS)
+    np.testing.assert_array_equal(
+        vitals_vectorized(0, WIN_SIZE, WIN_SIZE, n_windows, sig, time, MPD),
+        vitals(0, WIN_SIZE, WIN_SIZE, n_windows, sig, time, MPD))
+
+
+def test_bpm_array_uses_the_peaks_engine():
+    sig, _ = synthetic_bcg(3, FS)
+    filtered = BCG_hr.compute_filtered_signal(sig, FS)
+    expected = estimate_rates(filtered, FS, WIN_SIZE, hop=WIN_SIZE, method='peaks')
+    np.testing.assert_array_equal(BCG_hr.calculate_bpm_array(filtered, FS, hop_sec=10), expected)
+    np.testing.assert_array_equal(BCG_hr.calculate_bpm_array(filtered, FS), expected)